@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
      'properties',
 
@@ -45,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'properties.middleware.RequestMetricsMiddleware',
+    'properties.middleware.DeferredInvalidationMiddleware',
+    'properties.middleware.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -133,10 +137,84 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        # django_redis behind a per-process LRU, kept coherent via pub/sub
+        "BACKEND": "properties.cache_backends.TwoTierRedisCache",
         "LOCATION": "redis://redis:6379/1",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "SERIALIZER": "properties.cache_backends.RawBytesSerializer",
+            # Values of 1 KiB and more are compressed (zlib, lz4 or zstd)
+            "COMPRESSOR": "properties.cache_backends.ThresholdCompressor",
+            "COMPRESS_MIN_LENGTH": 1024,
+            "COMPRESS_CODEC": "zlib",
+            "L1_MAX_ENTRIES": 1024,
+            "L1_TIMEOUT": 5,
+            # Per key family cache counters are pushed to Redis this often
+            "METRICS_FLUSH_INTERVAL": 10,
         }
     }
 }
+
+# Read replicas for listing traffic: aliases of DATABASES entries that
+# replicate default, e.g. 'replica': {**DATABASES['default'], 'HOST': ...}.
+# Reads stay on default when this is empty.
+DATABASE_ROUTERS = ['properties.routers.ReplicaRouter']
+PROPERTIES_READ_REPLICAS = []
+
+# Seconds reads stay on default after a write (for the writing client, and
+# for all Property reads, which rebuild the cache); replicas lagging by more
+# are skipped, as are replicas failing the probe run this often.
+PROPERTIES_READ_YOUR_WRITES_WINDOW = 5
+PROPERTIES_REPLICA_HEALTH_INTERVAL = 5
+
+# Above this many (estimated) rows property_list reports the Postgres planner
+# estimate instead of running COUNT(*). Set to None to always count exactly.
+PROPERTIES_EXACT_COUNT_THRESHOLD = 100_000
+
+# Seconds a request waits for another worker to rebuild a missing properties
+# cache entry before rebuilding it itself.
+PROPERTIES_CACHE_LOCK_WAIT = 0.5
+
+# XFetch early-refresh aggressiveness for properties cache entries (0 disables).
+PROPERTIES_CACHE_XFETCH_BETA = 1.0
+
+# Seconds a cached listing page is fresh. Older pages (up to the hard TTL of
+# an hour) are still served while a Celery task rebuilds them; None makes
+# the request rebuild them instead.
+PROPERTIES_LISTING_SOFT_TIMEOUT = 60 * 5
+
+# Listing filter shapes a Property update is checked against before it may
+# skip invalidating the cached pages; with more cached per generation,
+# every update invalidates them.
+PROPERTIES_LISTING_MAX_SHAPES = 500
+
+# Extra seconds a committed Property write waits so invalidations from other
+# writers can share its Redis round trip (0: only batch concurrent commits).
+PROPERTIES_INVALIDATION_WINDOW = 0
+
+# Lower edges of the price buckets of /properties/facets (the last is open)
+PROPERTIES_FACET_PRICE_BUCKETS = [0, 50_000, 100_000, 250_000, 500_000, 1_000_000]
+
+# Facet shapes kept up to date by writes; the least recently requested ones
+# beyond this are dropped (and rebuilt when requested again).
+PROPERTIES_FACET_MAX_SHAPES = 500
+
+# Celery Configuration (cache lives in Redis db 1, the broker in db 0)
+CELERY_BROKER_URL = 'redis://redis:6379/0'
+CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = 'UTC'
+
+# Listing cache warm-up (properties.warmup)
+PROPERTIES_ACCESS_STATS_SAMPLE_RATE = 0.1
+PROPERTIES_WARM_QUERIES = [
+    {},
+    {"cursor": ""},
+]
+PROPERTIES_WARM_TOP_N = 50
+PROPERTIES_WARM_WORKERS = 4
+# Warm automatically once Property writes have been quiet for this long
+PROPERTIES_WARM_AFTER_WRITES = True
+PROPERTIES_WARM_DEBOUNCE = 30
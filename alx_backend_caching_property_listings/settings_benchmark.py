@@ -0,0 +1,63 @@
+"""
+Settings for the properties benchmarks (``benchmark_property_list``) on a
+developer machine: a local Postgres and Redis instead of the docker-compose
+hosts, or an in-process fakeredis server with ``REDIS_URL=fakeredis``.
+
+    DJANGO_SETTINGS_MODULE=alx_backend_caching_property_listings.settings_benchmark \\
+        python manage.py benchmark_property_list --sizes 10000 --output results.json
+"""
+import copy
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, DATABASES
+
+# The base settings name the project package without underscores
+ROOT_URLCONF = "alx_backend_caching_property_listings.urls"
+
+# Query logging would grow without bound over a long run
+DEBUG = False
+ALLOWED_HOSTS = ["testserver", "localhost", "127.0.0.1"]
+
+DATABASES = copy.deepcopy(DATABASES)
+DATABASES["default"].update(
+    HOST=os.environ.get("POSTGRES_HOST", "localhost"),
+    PORT=os.environ.get("POSTGRES_PORT", "5432"),
+    NAME=os.environ.get("POSTGRES_DB", DATABASES["default"]["NAME"]),
+    USER=os.environ.get("POSTGRES_USER", DATABASES["default"]["USER"]),
+    PASSWORD=os.environ.get("POSTGRES_PASSWORD", DATABASES["default"]["PASSWORD"]),
+)
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/1")
+
+CACHES = copy.deepcopy(CACHES)
+if REDIS_URL == "fakeredis":
+    try:
+        import fakeredis
+        import fakeredis.aioredis
+    except ImportError as exc:
+        raise ImproperlyConfigured(
+            "REDIS_URL=fakeredis requires the fakeredis package"
+        ) from exc
+
+    _fake_server = fakeredis.FakeServer()
+    CACHES["default"]["LOCATION"] = "redis://localhost:6379/1"
+    CACHES["default"]["OPTIONS"].update(
+        CONNECTION_POOL_KWARGS={
+            "connection_class": fakeredis.FakeRedisConnection,
+            "server": _fake_server,
+        },
+        ASYNC_CONNECTION_POOL_KWARGS={
+            "connection_class": fakeredis.aioredis.FakeAsyncRedisConnection,
+            "server": _fake_server,
+        },
+    )
+else:
+    CACHES["default"]["LOCATION"] = REDIS_URL
+
+# Warm-ups after writes would run alongside the measured requests
+PROPERTIES_WARM_AFTER_WRITES = False
+# No Celery worker runs stale-page refreshes here
+PROPERTIES_LISTING_SOFT_TIMEOUT = None
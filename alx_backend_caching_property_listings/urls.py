@@ -18,9 +18,11 @@ from django.contrib import admin
 from django.urls import path
 from django.urls import path, include
 
+from properties.views import property_metrics
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path("properties/metrics", property_metrics, name="property-metrics"),
     path("properties/", include("properties.urls")),
 ]
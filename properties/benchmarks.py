@@ -0,0 +1,240 @@
+"""
+Helpers shared by the properties benchmark management commands.
+"""
+import asyncio
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+
+from .cache import invalidate_properties_cache
+from .models import Property
+
+LOCATIONS = [
+    "Lagos", "Abuja", "Ibadan", "Kano", "Port Harcourt", "Enugu", "Lekki",
+    "Victoria Island", "Ikeja", "Benin City", "Calabar", "Jos",
+]
+
+WORDS = [
+    "spacious", "modern", "cozy", "luxury", "apartment", "duplex", "bungalow",
+    "garden", "pool", "beach", "view", "quiet", "estate", "serviced", "terrace",
+    "furnished", "parking", "security", "balcony", "penthouse", "studio",
+]
+
+
+def _sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def seed_properties(count, batch_size=5000, seed=42):
+    """
+    Insert ``count`` synthetic properties with ``bulk_create`` and return
+    the number of rows created. The same ``seed`` yields the same rows.
+    """
+    rng = random.Random(seed)
+    created = 0
+
+    while created < count:
+        size = min(batch_size, count - created)
+        Property.objects.bulk_create(
+            Property(
+                title=_sentence(rng, 4).title(),
+                description=_sentence(rng, 60),
+                price=Decimal(rng.randrange(5_000, 5_000_000)) / 100,
+                location=rng.choice(LOCATIONS),
+                # Roughly the extent of Nigeria
+                latitude=rng.uniform(4.0, 14.0),
+                longitude=rng.uniform(3.0, 15.0),
+            )
+            for _ in range(size)
+        )
+        created += size
+
+    return created
+
+
+def time_calls(func, iterations, warmup=1):
+    """
+    Call ``func`` ``warmup + iterations`` times and return the durations of
+    the timed calls in seconds.
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def run_threaded(func, requests, concurrency):
+    """
+    Call ``func`` ``requests`` times from ``concurrency`` threads.
+
+    Returns ``(durations, wall_seconds)``.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda _: _timed(func), range(requests)))
+    return samples, time.perf_counter() - started
+
+
+def run_async(coro_func, requests, concurrency):
+    """
+    Await ``coro_func()`` ``requests`` times, at most ``concurrency`` at once,
+    on a fresh event loop. Returns ``(durations, wall_seconds)``.
+    """
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await coro_func()
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(one() for _ in range(requests)))
+        return list(samples), time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    Return count, mean and p50/p95/p99 of ``samples`` in milliseconds.
+    """
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+# -------------------
+# Listing load generation
+# -------------------
+PRICE_RANGES = [
+    (None, None), (None, 100_000), (50_000, 500_000), (250_000, None),
+]
+
+
+def query_mix(requests, shapes, seed=42, search=True):
+    """
+    Return ``requests`` listing query strings drawn from ``shapes``
+    distinct-ish query shapes (filters, page sizes, pages, keyset and geo
+    requests) in a reproducible order. ``search`` adds ``?q=`` shapes,
+    which need PostgreSQL.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(shapes):
+        params = {}
+        if rng.random() < 0.6:
+            params["location"] = rng.choice(LOCATIONS).lower()
+        min_price, max_price = rng.choice(PRICE_RANGES)
+        if min_price is not None:
+            params["min_price"] = min_price
+        if max_price is not None:
+            params["max_price"] = max_price
+        params["per_page"] = rng.choice((10, 20, 50))
+
+        kind = rng.random()
+        if kind < 0.2:
+            params["cursor"] = ""
+        elif kind < 0.3:
+            params["near"] = f"{rng.uniform(4.0, 14.0):.2f},{rng.uniform(3.0, 15.0):.2f}"
+            params["radius_km"] = rng.choice((5, 25, 100))
+        elif kind < 0.4 and search:
+            params["q"] = rng.choice(WORDS)
+        else:
+            params["page"] = rng.randint(1, 5)
+        pool.append(urlencode(params))
+
+    return [rng.choice(pool) for _ in range(requests)]
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def local_server():
+    """
+    Serve the project's WSGI application from a threaded server on an
+    ephemeral localhost port and yield its base URL.
+    """
+    server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietRequestHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def http_get(url):
+    """
+    GET ``url`` and return the response status, reading the whole body.
+    """
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+@contextmanager
+def invalidation_storm(interval):
+    """
+    Invalidate the properties cache every ``interval`` seconds from a
+    background thread while the block runs. Yields a dict whose
+    ``invalidations`` is the number sent once the block exits.
+    """
+    stats = {"invalidations": 0}
+    stop = threading.Event()
+
+    def storm():
+        while not stop.wait(interval):
+            invalidate_properties_cache()
+            stats["invalidations"] += 1
+
+    thread = threading.Thread(target=storm, daemon=True)
+    thread.start()
+    try:
+        yield stats
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,489 @@
+"""
+Versioned cache namespace for the properties app.
+
+Every listing cache key written by the app embeds the current
+*generation*. A Property write that can change which properties a listing
+holds bumps the generation, which makes all older keys unreachable at
+once; they are never scanned or deleted and simply expire through their
+TTL. Other writes only bump the
+*revision* (``touch_properties_cache``), which the HTTP validators include.
+
+Rebuilds are single-flight: a short lock (``cache.add``, i.e. Redis
+``SET NX``) lets one worker recompute a missing entry while the others wait
+briefly for it or are handed the previous value. Entries built through
+``get_or_build`` are also refreshed probabilistically shortly before they
+expire (XFetch), so hot keys rarely miss at all.
+
+Entries can also have a soft TTL below their hard (Redis) TTL. Past it,
+they are still served as they are, and a single background refresh is
+scheduled instead of making the request wait for the rebuild
+(stale-while-revalidate).
+"""
+import asyncio
+import logging
+import math
+import random
+import struct
+import time
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "properties"
+GENERATION_CACHE_KEY = f"{CACHE_NAMESPACE}:generation"
+REVISION_CACHE_KEY = f"{CACHE_NAMESPACE}:revision"
+LAST_MODIFIED_PREFIX = f"{CACHE_NAMESPACE}:last_modified"
+LAST_MODIFIED_TIMEOUT = 60 * 60 * 24  # 1 day
+
+LOCK_TIMEOUT = 10  # seconds a rebuild may hold its lock
+REFRESH_TIMEOUT = 60  # seconds a scheduled refresh blocks scheduling another
+POLL_INTERVAL = 0.05
+DEFAULT_LOCK_WAIT = 0.5
+DEFAULT_XFETCH_BETA = 1.0
+
+
+def _initial_generation():
+    # Seeded from the clock so a counter lost to eviction or a Redis restart
+    # never restarts at a value whose keys may still be alive.
+    return int(time.time() * 1000)
+
+
+def get_cache_generation():
+    """
+    Return the current generation of the properties namespace.
+    """
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, _initial_generation(), timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def get_cache_revision():
+    """
+    Return the current revision, which changes with every Property write.
+    """
+    revision = cache.get(REVISION_CACHE_KEY)
+    if revision is None:
+        # Clock-seeded like the generation, so validators are never reused
+        cache.add(REVISION_CACHE_KEY, _initial_generation(), timeout=None)
+        revision = cache.get(REVISION_CACHE_KEY)
+    return revision
+
+
+def versioned_key(prefix, suffix, generation=None):
+    """
+    Build ``<prefix>:g<generation>:<suffix>`` for the current generation.
+    """
+    if generation is None:
+        generation = get_cache_generation()
+    return f"{prefix}:g{generation}:{suffix}"
+
+
+def get_last_modified(generation=None):
+    """
+    Return when ``generation`` became current, as a Unix timestamp.
+
+    The time is recorded by ``invalidate_properties_cache``. If it is
+    missing (first start, eviction) the first reader records the current
+    time, which is never earlier than the data it describes.
+    """
+    if generation is None:
+        generation = get_cache_generation()
+    key = f"{LAST_MODIFIED_PREFIX}:g{generation}"
+    last_modified = cache.get(key)
+    if last_modified is None:
+        cache.add(key, int(time.time()), LAST_MODIFIED_TIMEOUT)
+        last_modified = cache.get(key)
+    return last_modified
+
+
+def _execute_invalidating(pipeline, *keys):
+    """
+    Execute ``pipeline`` and drop the ``keys`` it changed from the L1 of
+    every process, when the cache has one.
+    """
+    execute_invalidating = getattr(cache, "execute_invalidating", None)
+    if execute_invalidating is None:
+        return pipeline.execute()
+    return execute_invalidating(pipeline, *keys)
+
+
+# Bumps the generation (or seeds it from the clock if it was lost) and
+# stamps its last-modified time in a single round trip. KEYS[2] is the made
+# key of the last-modified prefix, the generation is appended to it.
+_INVALIDATE_SCRIPT = """
+local generation
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    generation = redis.call('INCR', KEYS[1])
+else
+    redis.call('SET', KEYS[1], ARGV[3])
+    generation = ARGV[3]
+end
+redis.call('SET', KEYS[2] .. generation, ARGV[1], 'EX', ARGV[2], 'NX')
+return generation
+"""
+
+
+@lru_cache(maxsize=None)
+def _invalidate_script(client):
+    return client.register_script(_INVALIDATE_SCRIPT)
+
+
+def invalidate_properties_cache():
+    """
+    Invalidate every cached listing page and view response in O(1).
+
+    The generation bump, its last-modified stamp and the L1 invalidation
+    announcement are sent as one Redis pipeline.
+    """
+    client = cache.client.get_client(write=True)
+    pipeline = client.pipeline(transaction=False)
+    _invalidate_script(client)(
+        keys=[
+            cache.make_key(GENERATION_CACHE_KEY),
+            cache.make_key(f"{LAST_MODIFIED_PREFIX}:g"),
+        ],
+        args=[int(time.time()), LAST_MODIFIED_TIMEOUT, _initial_generation()],
+        client=pipeline,
+    )
+    return int(_execute_invalidating(pipeline, GENERATION_CACHE_KEY)[0])
+
+
+# Stamps the last-modified time of the current generation (KEYS[2] is the
+# made key of the prefix, as above) and bumps the revision, or seeds it
+_TOUCH_SCRIPT = """
+local generation = redis.call('GET', KEYS[1])
+if generation then
+    redis.call('SET', KEYS[2] .. generation, ARGV[1], 'EX', ARGV[2])
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return redis.call('INCR', KEYS[3])
+end
+redis.call('SET', KEYS[3], ARGV[3])
+return ARGV[3]
+"""
+
+
+@lru_cache(maxsize=None)
+def _touch_script(client):
+    return client.register_script(_TOUCH_SCRIPT)
+
+
+def touch_properties_cache():
+    """
+    Record a Property write that leaves every cached listing page valid:
+    bump the revision and the last-modified time, keep the generation.
+    """
+    client = cache.client.get_client(write=True)
+    pipeline = client.pipeline(transaction=False)
+    _touch_script(client)(
+        keys=[
+            cache.make_key(GENERATION_CACHE_KEY),
+            cache.make_key(f"{LAST_MODIFIED_PREFIX}:g"),
+            cache.make_key(REVISION_CACHE_KEY),
+        ],
+        args=[int(time.time()), LAST_MODIFIED_TIMEOUT, _initial_generation()],
+        client=pipeline,
+    )
+    results = _execute_invalidating(
+        pipeline,
+        REVISION_CACHE_KEY,
+        f"{LAST_MODIFIED_PREFIX}:g{get_cache_generation()}",
+    )
+    return int(results[0])
+
+
+def _lock_wait():
+    return getattr(settings, "PROPERTIES_CACHE_LOCK_WAIT", DEFAULT_LOCK_WAIT)
+
+
+def _xfetch_beta():
+    return getattr(settings, "PROPERTIES_CACHE_XFETCH_BETA", DEFAULT_XFETCH_BETA)
+
+
+def _acquire_lock(key):
+    return cache.add(f"{key}:lock", 1, LOCK_TIMEOUT)
+
+
+def _release_lock(key):
+    cache.delete(f"{key}:lock")
+
+
+def _wait_for(key):
+    """
+    Poll ``key`` until it is filled or the lock wait runs out.
+    """
+    deadline = time.monotonic() + _lock_wait()
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def _expires_early(delta, expires_at):
+    # Past its soft TTL; entries without one are gone from Redis by then
+    if time.time() >= expires_at:
+        return True
+    beta = _xfetch_beta()
+    if not beta:
+        return False
+    # -log(U) with U in (0, 1] is an Exp(1) sample
+    jitter = -delta * beta * math.log(1.0 - random.random())
+    return time.time() + jitter >= expires_at
+
+
+# Bytes values are stored with a fixed binary header instead of inside a
+# tuple, so they reach the cache backend as raw bytes and are never pickled.
+_BYTES_ENTRY_MARKER = b"XF"
+_BYTES_ENTRY_HEADER = struct.Struct("!dd")
+
+
+def _pack_entry(value, delta, expires_at):
+    if isinstance(value, bytes):
+        return (
+            _BYTES_ENTRY_MARKER
+            + _BYTES_ENTRY_HEADER.pack(delta, expires_at)
+            + value
+        )
+    return value, delta, expires_at
+
+
+def _unpack_entry(entry):
+    if isinstance(entry, bytes):
+        offset = len(_BYTES_ENTRY_MARKER)
+        delta, expires_at = _BYTES_ENTRY_HEADER.unpack_from(entry, offset)
+        return entry[offset + _BYTES_ENTRY_HEADER.size:], delta, expires_at
+    return entry
+
+
+def _build_and_store(key, build, timeout, stale_key, soft_timeout=None):
+    started = time.monotonic()
+    value = build()
+    delta = time.monotonic() - started
+
+    expires_at = time.time() + (soft_timeout or timeout)
+    cache.set(key, _pack_entry(value, delta, expires_at), timeout)
+    if stale_key is not None:
+        cache.set(stale_key, value, timeout)
+    return value
+
+
+def _refresh_marker(key):
+    return f"{key}:refresh"
+
+
+def _schedule_refresh(key, refresh):
+    # One pending refresh per entry; the marker expires if the task is lost.
+    # It is kept when queuing fails too, so a broker outage costs one
+    # attempt per entry and REFRESH_TIMEOUT rather than one per request.
+    if not cache.add(_refresh_marker(key), 1, REFRESH_TIMEOUT):
+        return
+    try:
+        refresh()
+    except Exception as exc:
+        logger.warning("Could not schedule a refresh of %s: %s", key, exc)
+
+
+def get_or_build(key, build, timeout, stale_key=None, soft_timeout=None, refresh=None):
+    """
+    Return the value cached under ``key``, calling ``build()`` on a miss.
+
+    Only one worker runs ``build()`` at a time. The others are served the
+    last value stored under ``stale_key`` (which survives invalidation) if
+    there is one, else they wait up to ``PROPERTIES_CACHE_LOCK_WAIT``
+    seconds for the winner before building the value themselves.
+
+    With ``soft_timeout`` the value is fresh for that many seconds and kept
+    for ``timeout``. A stale value (or one XFetch picks for an early
+    refresh) is returned as it is, and ``refresh()`` is called once to have
+    it rebuilt in the background, e.g. by queuing a task that calls
+    ``refresh_entry``. Without ``refresh`` the caller rebuilds it.
+    """
+    value, _ = get_or_build_entry(
+        key, build, timeout, stale_key, soft_timeout, refresh
+    )
+    return value
+
+
+def get_or_build_entry(
+    key, build, timeout, stale_key=None, soft_timeout=None, refresh=None
+):
+    """
+    ``get_or_build``, returning ``(value, fresh)``.
+
+    ``fresh`` is False for a fallback: a value past its soft TTL, or the
+    one under ``stale_key``, which may predate an invalidation. Anything
+    derived from it must not be cached or validated as current.
+    """
+    entry = cache.get(key)
+
+    if entry is not None:
+        value, delta, expires_at = _unpack_entry(entry)
+        if not _expires_early(delta, expires_at):
+            return value, True
+        fresh = time.time() < expires_at
+        if refresh is not None:
+            _schedule_refresh(key, refresh)
+            return value, fresh
+        if not _acquire_lock(key):
+            return value, fresh
+        try:
+            return _build_and_store(key, build, timeout, stale_key, soft_timeout), True
+        finally:
+            _release_lock(key)
+
+    if _acquire_lock(key):
+        try:
+            return _build_and_store(key, build, timeout, stale_key, soft_timeout), True
+        finally:
+            _release_lock(key)
+
+    if stale_key is not None:
+        value = cache.get(stale_key)
+        if value is not None:
+            return value, False
+
+    entry = _wait_for(key)
+    if entry is not None:
+        return _unpack_entry(entry)[0], True
+    return _build_and_store(key, build, timeout, stale_key, soft_timeout), True
+
+
+def refresh_entry(key, build, timeout, stale_key=None, soft_timeout=None):
+    """
+    Rebuild the value under ``key`` for a refresh scheduled by
+    ``get_or_build``, unless another worker is rebuilding it already.
+
+    Returns whether it was rebuilt.
+    """
+    try:
+        if not _acquire_lock(key):
+            return False
+        try:
+            _build_and_store(key, build, timeout, stale_key, soft_timeout)
+        finally:
+            _release_lock(key)
+        return True
+    finally:
+        cache.delete(_refresh_marker(key))
+
+
+# -------------------
+# Async variants (for async views; use the backend's aget/aset/aadd/adelete)
+# -------------------
+async def aget_cache_generation():
+    generation = await cache.aget(GENERATION_CACHE_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_CACHE_KEY, _initial_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_CACHE_KEY)
+    return generation
+
+
+async def aget_cache_revision():
+    revision = await cache.aget(REVISION_CACHE_KEY)
+    if revision is None:
+        await cache.aadd(REVISION_CACHE_KEY, _initial_generation(), timeout=None)
+        revision = await cache.aget(REVISION_CACHE_KEY)
+    return revision
+
+
+async def aget_last_modified(generation=None):
+    if generation is None:
+        generation = await aget_cache_generation()
+    key = f"{LAST_MODIFIED_PREFIX}:g{generation}"
+    last_modified = await cache.aget(key)
+    if last_modified is None:
+        await cache.aadd(key, int(time.time()), LAST_MODIFIED_TIMEOUT)
+        last_modified = await cache.aget(key)
+    return last_modified
+
+
+async def _abuild_and_store(key, abuild, timeout, stale_key, soft_timeout=None):
+    started = time.monotonic()
+    value = await abuild()
+    delta = time.monotonic() - started
+
+    expires_at = time.time() + (soft_timeout or timeout)
+    await cache.aset(key, _pack_entry(value, delta, expires_at), timeout)
+    if stale_key is not None:
+        await cache.aset(stale_key, value, timeout)
+    return value
+
+
+async def _abuild_locked(key, abuild, timeout, stale_key, soft_timeout):
+    try:
+        return await _abuild_and_store(key, abuild, timeout, stale_key, soft_timeout)
+    finally:
+        await cache.adelete(f"{key}:lock")
+
+
+async def _aschedule_refresh(key, refresh):
+    if not await cache.aadd(_refresh_marker(key), 1, REFRESH_TIMEOUT):
+        return
+    try:
+        # Queuing a task is blocking I/O
+        await sync_to_async(refresh)()
+    except Exception as exc:
+        logger.warning("Could not schedule a refresh of %s: %s", key, exc)
+
+
+async def aget_or_build(
+    key, abuild, timeout, stale_key=None, soft_timeout=None, refresh=None
+):
+    """
+    Async ``get_or_build``: ``abuild`` is a coroutine function, ``refresh``
+    still a plain one.
+
+    Entries are shared with the sync version (same keys, same format).
+    """
+    value, _ = await aget_or_build_entry(
+        key, abuild, timeout, stale_key, soft_timeout, refresh
+    )
+    return value
+
+
+async def aget_or_build_entry(
+    key, abuild, timeout, stale_key=None, soft_timeout=None, refresh=None
+):
+    """
+    Async ``get_or_build_entry``.
+    """
+    entry = await cache.aget(key)
+
+    if entry is not None:
+        value, delta, expires_at = _unpack_entry(entry)
+        if not _expires_early(delta, expires_at):
+            return value, True
+        fresh = time.time() < expires_at
+        if refresh is not None:
+            await _aschedule_refresh(key, refresh)
+            return value, fresh
+        if not await cache.aadd(f"{key}:lock", 1, LOCK_TIMEOUT):
+            return value, fresh
+        value = await _abuild_locked(key, abuild, timeout, stale_key, soft_timeout)
+        return value, True
+
+    if await cache.aadd(f"{key}:lock", 1, LOCK_TIMEOUT):
+        value = await _abuild_locked(key, abuild, timeout, stale_key, soft_timeout)
+        return value, True
+
+    if stale_key is not None:
+        value = await cache.aget(stale_key)
+        if value is not None:
+            return value, False
+
+    deadline = time.monotonic() + _lock_wait()
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        entry = await cache.aget(key)
+        if entry is not None:
+            return _unpack_entry(entry)[0], True
+    value = await _abuild_and_store(key, abuild, timeout, stale_key, soft_timeout)
+    return value, True
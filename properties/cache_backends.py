@@ -0,0 +1,790 @@
+"""
+Two-tier cache backend: a per-process LRU (L1) in front of django_redis (L2).
+
+Reads are served from L1 when possible, saving the Redis round trip. Every
+write, delete or increment goes through to Redis and is announced on a
+pub/sub channel; each process runs a small listener thread that drops the
+affected L1 entries, so workers stop serving a changed key within
+milliseconds. L1 entries also carry a short TTL as a safety net for lost
+messages.
+
+The ``aget``/``aget_many``/``aset``/``aadd``/``aadd_many``/``adelete``
+coroutines talk to Redis through ``redis.asyncio`` instead of a thread,
+sharing the L1 and its invalidation.
+
+Every operation is also instrumented per key family (``all_properties``,
+``property_list_json``, ``property``, ...): hits, misses, sets, bytes and
+get/set latency histograms are aggregated in process (see
+``properties.metrics``). A background thread periodically flushes that
+registry to Redis hashes, so the numbers cover only this app's keys and add
+up across workers.
+
+Configure it in ``CACHES`` in place of ``django_redis.cache.RedisCache``::
+
+    "BACKEND": "properties.cache_backends.TwoTierRedisCache",
+    "OPTIONS": {
+        "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        "SERIALIZER": "properties.cache_backends.RawBytesSerializer",
+        "COMPRESSOR": "properties.cache_backends.ThresholdCompressor",
+        "COMPRESS_MIN_LENGTH": 1024,
+        "COMPRESS_CODEC": "zlib",
+        "L1_MAX_ENTRIES": 1024,
+        "L1_TIMEOUT": 5,
+        "METRICS_FLUSH_INTERVAL": 10,
+    },
+"""
+import asyncio
+import json
+import logging
+import pickle
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured
+from django_redis.cache import RedisCache
+from django_redis.compressors.base import BaseCompressor
+from django_redis.exceptions import CompressorError
+from django_redis.serializers.pickle import PickleSerializer
+from redis import asyncio as aioredis
+
+from .metrics import registry
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover - optional codec
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_L1_MAX_ENTRIES = 1024
+DEFAULT_L1_TIMEOUT = 5  # seconds
+DEFAULT_INVALIDATION_CHANNEL = "properties:l1-invalidate"
+LISTENER_RETRY_DELAY = 1  # seconds
+DEFAULT_METRICS_FLUSH_INTERVAL = 10  # seconds
+
+_MISSING = object()
+
+# Bytes that went through the serializer during the current operation
+_io = threading.local()
+
+
+def _take_io_bytes():
+    nbytes = getattr(_io, "nbytes", 0)
+    _io.nbytes = 0
+    return nbytes
+
+
+def key_family(key):
+    """
+    Return the logical family of a cache key, e.g. ``all_properties``.
+    """
+    if key.startswith("views.decorators.cache.cache_page"):
+        return "cache_page"
+    if key.startswith("views.decorators.cache.cache_header"):
+        return "cache_header"
+    family, _, rest = key.partition(":")
+    if rest.endswith(":lock"):
+        return f"{family}:lock"
+    return family
+
+# Values of these types are kept in L1 as-is; anything else is pickled so
+# callers never share a mutable object across requests or threads.
+_IMMUTABLE_TYPES = (bytes, str, int, float, bool, type(None))
+
+
+class RawBytesSerializer(PickleSerializer):
+    """
+    Pickle serializer that stores ``bytes`` values verbatim.
+
+    Pre-encoded payloads (such as cached JSON response bodies) are written
+    behind a one-byte marker and come back without a pickle round trip.
+    Pickles never start with the marker, so both kinds of value coexist.
+    """
+
+    RAW_MARKER = b"R"
+
+    def dumps(self, value):
+        if isinstance(value, bytes):
+            data = self.RAW_MARKER + value
+        else:
+            data = super().dumps(value)
+        _io.nbytes = getattr(_io, "nbytes", 0) + len(data)
+        return data
+
+    def loads(self, value):
+        _io.nbytes = getattr(_io, "nbytes", 0) + len(value)
+        if value[:1] == self.RAW_MARKER:
+            return value[1:]
+        return super().loads(value)
+
+
+def _codecs():
+    """
+    Return ``{name: (tag, compress, decompress)}`` for the available codecs.
+    """
+    codecs = {
+        "zlib": (b"z", lambda data: zlib.compress(data, 1), zlib.decompress),
+    }
+    if lz4 is not None:
+        codecs["lz4"] = (b"l", lz4.frame.compress, lz4.frame.decompress)
+    if zstandard is not None:
+        codecs["zstd"] = (
+            b"s",
+            lambda data: zstandard.compress(data, 1),
+            zstandard.decompress,
+        )
+    return codecs
+
+
+class ThresholdCompressor(BaseCompressor):
+    """
+    Compress values of at least ``COMPRESS_MIN_LENGTH`` bytes with the
+    ``COMPRESS_CODEC`` codec (zlib, or lz4/zstd when installed).
+
+    Compressed values start with a marker byte and a codec tag, so reads are
+    transparent: small values stay uncompressed, and values written with
+    another codec can still be read after the setting changes.
+    """
+
+    MARKER = b"Z"
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.min_length = options.get("COMPRESS_MIN_LENGTH", 1024)
+
+        self._codecs = _codecs()
+        self._decoders = {
+            tag: decompress for tag, _, decompress in self._codecs.values()
+        }
+        codec = options.get("COMPRESS_CODEC", "zlib")
+        if codec not in self._codecs:
+            raise ImproperlyConfigured(
+                f"Cache compression codec {codec!r} is not available"
+            )
+        self._tag, self._compress, _ = self._codecs[codec]
+
+    def compress(self, value):
+        if len(value) < self.min_length:
+            return value
+        compressed = self._compress(value)
+        if len(compressed) + 2 >= len(value):
+            return value
+        return self.MARKER + self._tag + compressed
+
+    def decompress(self, value):
+        if value[:1] != self.MARKER:
+            raise CompressorError("Value is not compressed")
+        decompress = self._decoders.get(value[1:2])
+        if decompress is None:
+            raise CompressorError(f"Unknown compression codec tag {value[1:2]!r}")
+        return decompress(value[2:])
+
+
+class LocalLRU:
+    """
+    Thread-safe, bounded LRU mapping with per-entry expiry.
+
+    ``epoch`` increases on every invalidation, which lets a reader detect
+    that an invalidation raced with its Redis read.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.epoch = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled, payload = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(payload) if pickled else payload
+
+    def set(self, key, value, timeout=None, epoch=None):
+        pickled = not isinstance(value, _IMMUTABLE_TYPES)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL) if pickled else value
+        if timeout is None:
+            timeout = self.timeout
+        else:
+            timeout = min(timeout, self.timeout)
+        if timeout <= 0:
+            return
+
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._data[key] = (time.monotonic() + timeout, pickled, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            self.epoch += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._data.clear()
+
+
+class _ProcessState:
+    """
+    What a backend shares with every other instance of the same cache in
+    this process: the L1, its background threads and the async clients.
+    """
+
+    def __init__(self, l1):
+        self.l1 = l1
+        self.instance_id = uuid.uuid4().hex
+        self.listener = None
+        self.flusher = None
+        self.threads_lock = threading.Lock()
+        # redis.asyncio connections are bound to the loop that opened them
+        self.async_clients = weakref.WeakKeyDictionary()
+
+
+# Django creates a backend instance per thread (and per async context);
+# without this, a thread-per-request server would start a listener, and
+# hold a pub/sub connection, for every request thread.
+_process_states = {}
+_process_states_lock = threading.Lock()
+
+
+def _process_state(key, make_l1):
+    with _process_states_lock:
+        state = _process_states.get(key)
+        if state is None:
+            state = _process_states[key] = _ProcessState(make_l1())
+        return state
+
+
+class TwoTierRedisCache(RedisCache):
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get("OPTIONS", {})
+
+        self._channel = options.get(
+            "L1_INVALIDATION_CHANNEL", DEFAULT_INVALIDATION_CHANNEL
+        )
+        self._state = _process_state(
+            (repr(server), self._channel),
+            lambda: LocalLRU(
+                options.get("L1_MAX_ENTRIES", DEFAULT_L1_MAX_ENTRIES),
+                options.get("L1_TIMEOUT", DEFAULT_L1_TIMEOUT),
+            ),
+        )
+        self._l1 = self._state.l1
+        self._instance_id = self._state.instance_id
+        self._flush_interval = options.get(
+            "METRICS_FLUSH_INTERVAL", DEFAULT_METRICS_FLUSH_INTERVAL
+        )
+        self._async_pool_kwargs = options.get("ASYNC_CONNECTION_POOL_KWARGS", {})
+        self._async_clients = self._state.async_clients
+
+    # -------------------
+    # Statistics
+    # -------------------
+    def _count(self, name, key, amount=1):
+        registry.inc(f"cache_{name}", (("family", key_family(key)),), amount)
+
+    def _observe(self, name, key, started):
+        registry.observe(
+            f"cache_{name}_seconds",
+            (("family", key_family(key)),),
+            time.perf_counter() - started,
+        )
+
+    def flush_metrics(self):
+        """
+        Add the metrics recorded by this process since the last flush (cache
+        counters as well as request metrics) to the shared Redis hashes.
+        """
+        registry.flush(self.client.get_client(write=True), self.make_key)
+
+    def cluster_cache_stats(self):
+        """
+        Return ``{family: {field: value}}`` as flushed by all processes.
+
+        Fields are the metric names without the ``cache_`` prefix, with
+        histogram buckets as ``get_seconds_bucket:le=<bound>``.
+        """
+        samples = registry.load(
+            self.client.get_client(write=False), self.make_key, prefix="cache_"
+        )
+        stats = {}
+        for (name, labels), value in samples.items():
+            labels = dict(labels)
+            field = name[len("cache_"):]
+            if "le" in labels:
+                field = f"{field}:le={labels['le']}"
+            family = stats.setdefault(labels.get("family", "other"), {})
+            family[field] = value
+        return dict(sorted(stats.items()))
+
+    def pool_stats(self):
+        """
+        Return connection pool usage of this process' Redis clients.
+        """
+        pools = {}
+        for write in (True, False):
+            pool = self.client.get_client(write=write).connection_pool
+            pools[id(pool)] = pool
+
+        stats = dict.fromkeys(("created", "in_use", "available", "max"), 0)
+        for pool in pools.values():
+            stats["created"] += getattr(pool, "_created_connections", 0)
+            stats["in_use"] += len(getattr(pool, "_in_use_connections", ()))
+            stats["available"] += len(getattr(pool, "_available_connections", ()))
+            stats["max"] += getattr(pool, "max_connections", 0) or 0
+        return stats
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self._flush_interval)
+            try:
+                self.flush_metrics()
+            except Exception as exc:
+                logger.warning("Could not flush cache metrics: %s", exc)
+
+    # -------------------
+    # Invalidation over pub/sub
+    # -------------------
+    def _invalidation_message(self, keys=None):
+        message = {"origin": self._instance_id}
+        if keys is None:
+            message["flush"] = True
+        else:
+            message["keys"] = list(keys)
+        return json.dumps(message)
+
+    def _publish(self, keys=None, pipeline=None):
+        if pipeline is not None:
+            pipeline.publish(self._channel, self._invalidation_message(keys))
+            return
+        try:
+            self.client.get_client(write=True).publish(
+                self._channel, self._invalidation_message(keys)
+            )
+        except Exception as exc:
+            logger.warning("Could not publish L1 invalidation: %s", exc)
+
+    def _handle_message(self, data):
+        message = json.loads(data)
+        if message.get("origin") == self._instance_id:
+            return
+        if message.get("flush"):
+            self._l1.clear()
+        else:
+            self._l1.delete(*message.get("keys", ()))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.get_client(write=False).pubsub(
+                    ignore_subscribe_messages=True
+                )
+                pubsub.subscribe(self._channel)
+                # Anything published before the subscription is lost
+                self._l1.clear()
+                for message in pubsub.listen():
+                    self._handle_message(message["data"])
+            except Exception as exc:
+                logger.warning("L1 invalidation listener failed: %s", exc)
+                self._l1.clear()
+                time.sleep(LISTENER_RETRY_DELAY)
+
+    def _threads_alive(self):
+        state = self._state
+        return (
+            state.listener is not None
+            and state.listener.is_alive()
+            and state.flusher is not None
+            and state.flusher.is_alive()
+        )
+
+    def _ensure_threads(self):
+        # Also restarts the threads in a forked worker, where the parent's
+        # threads no longer run.
+        if self._threads_alive():
+            return
+        state = self._state
+        with state.threads_lock:
+            if state.listener is None or not state.listener.is_alive():
+                state.listener = threading.Thread(
+                    target=self._listen,
+                    name="properties-l1-invalidation",
+                    daemon=True,
+                )
+                state.listener.start()
+            if state.flusher is None or not state.flusher.is_alive():
+                state.flusher = threading.Thread(
+                    target=self._flush_periodically,
+                    name="properties-cache-metrics",
+                    daemon=True,
+                )
+                state.flusher.start()
+
+    def _invalidate(self, *keys, version=None):
+        made_keys = [self.make_key(key, version=version) for key in keys]
+        self._l1.delete(*made_keys)
+        self._publish(made_keys)
+
+    def invalidate_local(self, *keys, version=None):
+        """
+        Drop ``keys`` from the L1 of every process after they were changed
+        directly in Redis.
+        """
+        self._invalidate(*keys, version=version)
+
+    def execute_invalidating(self, pipeline, *keys, version=None):
+        """
+        Execute ``pipeline``, which changes ``keys`` directly in Redis, with
+        the L1 invalidation announcement queued at its end, and return its
+        results.
+
+        The local L1 is dropped only once the pipeline has run: dropped
+        earlier, a read in between could cache the old values again.
+        """
+        made_keys = [self.make_key(key, version=version) for key in keys]
+        self._publish(made_keys, pipeline)
+        try:
+            return pipeline.execute()
+        finally:
+            self._l1.delete(*made_keys)
+
+    # -------------------
+    # Cache API
+    # -------------------
+    def get(self, key, default=None, version=None, client=None):
+        self._ensure_threads()
+        started = time.perf_counter()
+        l1_key = self.make_key(key, version=version)
+
+        value = self._l1.get(l1_key)
+        if value is not _MISSING:
+            self._count("l1_hits", key)
+            self._observe("get", key, started)
+            return value
+
+        epoch = self._l1.epoch
+        _take_io_bytes()
+        value = super().get(key, _MISSING, version=version, client=client)
+        self._count("bytes_read", key, _take_io_bytes())
+        self._observe("get", key, started)
+
+        if value is _MISSING:
+            self._count("misses", key)
+            return default
+
+        self._count("l2_hits", key)
+        self._l1.set(l1_key, value, epoch=epoch)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        self._ensure_threads()
+        started = time.perf_counter()
+        keys = list(keys)
+        found = {}
+        remaining = []
+        for key in keys:
+            value = self._l1.get(self.make_key(key, version=version))
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+                self._count("l1_hits", key)
+
+        if remaining:
+            epoch = self._l1.epoch
+            _take_io_bytes()
+            fetched = super().get_many(remaining, version=version, client=client)
+            self._count("bytes_read", remaining[0], _take_io_bytes())
+            for key in remaining:
+                if key in fetched:
+                    self._count("l2_hits", key)
+                    self._l1.set(
+                        self.make_key(key, version=version), fetched[key], epoch=epoch
+                    )
+                else:
+                    self._count("misses", key)
+            found.update(fetched)
+
+        if keys:
+            self._observe("get", keys[0], started)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None,
+            nx=False, xx=False):
+        started = time.perf_counter()
+        _take_io_bytes()
+        result = super().set(
+            key, value, timeout=timeout, version=version, client=client,
+            nx=nx, xx=xx,
+        )
+        self._count("sets", key)
+        self._count("bytes_written", key, _take_io_bytes())
+        self._observe("set", key, started)
+        self._invalidate(key, version=version)
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        started = time.perf_counter()
+        _take_io_bytes()
+        result = super().set_many(data, timeout=timeout, version=version, client=client)
+        if data:
+            first_key = next(iter(data))
+            for key in data:
+                self._count("sets", key)
+            self._count("bytes_written", first_key, _take_io_bytes())
+            self._observe("set", first_key, started)
+        self._invalidate(*data, version=version)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        # Used for locks: always decided by Redis, never cached locally
+        return super().add(key, value, timeout=timeout, version=version, client=client)
+
+    def add_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        """
+        ``add`` every item of ``data`` (``SET NX``) in one pipeline and return
+        the keys that were not stored because they already exist.
+        """
+        timeout = self._timeout_ms(timeout)
+        if not data or (timeout is not None and timeout <= 0):
+            return list(data)
+        if client is None:
+            client = self.client.get_client(write=True)
+
+        started = time.perf_counter()
+        first_key = next(iter(data))
+        pipeline = client.pipeline(transaction=False)
+        _take_io_bytes()
+        for key, value in data.items():
+            pipeline.set(
+                self.make_key(key, version=version),
+                self.client.encode(value),
+                px=timeout,
+                nx=True,
+            )
+        self._count("bytes_written", first_key, _take_io_bytes())
+        stored = pipeline.execute()
+        self._observe("set", first_key, started)
+        return self._count_added(data, stored)
+
+    def _count_added(self, data, stored):
+        existing = []
+        for key, was_stored in zip(data, stored):
+            if was_stored:
+                self._count("sets", key)
+            else:
+                existing.append(key)
+        return existing
+
+    def delete(self, key, version=None, prefix=None, client=None):
+        result = super().delete(key, version=version, prefix=prefix, client=client)
+        self._invalidate(key, version=version)
+        return result
+
+    def delete_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        result = super().delete_many(keys, version=version, client=client)
+        self._invalidate(*keys, version=version)
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        result = super().delete_pattern(*args, **kwargs)
+        self._l1.clear()
+        self._publish()
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self._l1.clear()
+        self._publish()
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None, ignore_key_check=False):
+        result = super().incr(
+            key, delta=delta, version=version, client=client,
+            ignore_key_check=ignore_key_check,
+        )
+        self._invalidate(key, version=version)
+        return result
+
+    def decr(self, key, delta=1, version=None, client=None):
+        result = super().decr(key, delta=delta, version=version, client=client)
+        self._invalidate(key, version=version)
+        return result
+
+    def has_key(self, key, version=None, client=None):
+        if self._l1.get(self.make_key(key, version=version)) is not _MISSING:
+            return True
+        return super().has_key(key, version=version, client=client)
+
+    # -------------------
+    # Async cache API (redis.asyncio, shares L1 and metrics with the sync API)
+    # -------------------
+    def async_client(self):
+        """
+        Return the ``redis.asyncio`` client of the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = aioredis.Redis(
+                connection_pool=aioredis.ConnectionPool.from_url(
+                    self.client._server[0], **self._async_pool_kwargs
+                )
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def _ainvalidate(self, *keys, version=None):
+        made_keys = [self.make_key(key, version=version) for key in keys]
+        self._l1.delete(*made_keys)
+        try:
+            await self.async_client().publish(
+                self._channel, self._invalidation_message(made_keys)
+            )
+        except Exception as exc:
+            logger.warning("Could not publish L1 invalidation: %s", exc)
+
+    async def aget(self, key, default=None, version=None):
+        self._ensure_threads()
+        started = time.perf_counter()
+        l1_key = self.make_key(key, version=version)
+
+        value = self._l1.get(l1_key)
+        if value is not _MISSING:
+            self._count("l1_hits", key)
+            self._observe("get", key, started)
+            return value
+
+        epoch = self._l1.epoch
+        raw = await self.async_client().get(l1_key)
+        self._observe("get", key, started)
+        if raw is None:
+            self._count("misses", key)
+            return default
+
+        _take_io_bytes()
+        value = self.client.decode(raw)
+        self._count("bytes_read", key, _take_io_bytes())
+        self._count("l2_hits", key)
+        self._l1.set(l1_key, value, epoch=epoch)
+        return value
+
+    async def aget_many(self, keys, version=None):
+        self._ensure_threads()
+        started = time.perf_counter()
+        keys = list(keys)
+        found = {}
+        remaining = []
+        for key in keys:
+            value = self._l1.get(self.make_key(key, version=version))
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+                self._count("l1_hits", key)
+
+        if remaining:
+            epoch = self._l1.epoch
+            made_keys = [self.make_key(key, version=version) for key in remaining]
+            raw_values = await self.async_client().mget(made_keys)
+            _take_io_bytes()
+            for key, made_key, raw in zip(remaining, made_keys, raw_values):
+                if raw is None:
+                    self._count("misses", key)
+                    continue
+                value = found[key] = self.client.decode(raw)
+                self._count("l2_hits", key)
+                self._l1.set(made_key, value, epoch=epoch)
+            self._count("bytes_read", remaining[0], _take_io_bytes())
+
+        if keys:
+            self._observe("get", keys[0], started)
+        return found
+
+    def _timeout_ms(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else int(timeout * 1000)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        started = time.perf_counter()
+        timeout = self._timeout_ms(timeout)
+        if timeout is not None and timeout <= 0:
+            return await self.adelete(key, version=version)
+
+        _take_io_bytes()
+        encoded = self.client.encode(value)
+        self._count("bytes_written", key, _take_io_bytes())
+        result = await self.async_client().set(
+            self.make_key(key, version=version), encoded, px=timeout
+        )
+        self._count("sets", key)
+        self._observe("set", key, started)
+        await self._ainvalidate(key, version=version)
+        return bool(result)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Used for locks: always decided by Redis, never cached locally
+        timeout = self._timeout_ms(timeout)
+        if timeout is not None and timeout <= 0:
+            return False
+        encoded = self.client.encode(value)
+        _take_io_bytes()
+        return bool(
+            await self.async_client().set(
+                self.make_key(key, version=version), encoded, px=timeout, nx=True
+            )
+        )
+
+    async def aadd_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout_ms(timeout)
+        if not data or (timeout is not None and timeout <= 0):
+            return list(data)
+
+        started = time.perf_counter()
+        first_key = next(iter(data))
+        pipeline = self.async_client().pipeline(transaction=False)
+        _take_io_bytes()
+        for key, value in data.items():
+            pipeline.set(
+                self.make_key(key, version=version),
+                self.client.encode(value),
+                px=timeout,
+                nx=True,
+            )
+        self._count("bytes_written", first_key, _take_io_bytes())
+        stored = await pipeline.execute()
+        self._observe("set", first_key, started)
+        return self._count_added(data, stored)
+
+    async def adelete(self, key, version=None):
+        result = await self.async_client().delete(self.make_key(key, version=version))
+        await self._ainvalidate(key, version=version)
+        return bool(result)
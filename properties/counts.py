@@ -0,0 +1,100 @@
+"""
+Row counts for property listing pagination.
+
+Exact counts are cached per filter shape in the versioned properties
+namespace, so they are shared by every page of a listing and dropped with
+any Property write. When the planner expects more rows than
+``PROPERTIES_EXACT_COUNT_THRESHOLD`` the ``COUNT(*)`` is skipped and the
+Postgres estimate (``pg_class.reltuples`` or the ``EXPLAIN`` row estimate)
+is returned instead.
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .cache import get_or_build, versioned_key
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_PREFIX = "property_count"
+COUNT_CACHE_TIMEOUT = 3600  # 1 hour
+DEFAULT_EXACT_COUNT_THRESHOLD = 100_000
+
+
+def _exact_count_threshold():
+    return getattr(
+        settings,
+        "PROPERTIES_EXACT_COUNT_THRESHOLD",
+        DEFAULT_EXACT_COUNT_THRESHOLD,
+    )
+
+
+def _table_estimate(cursor, table):
+    cursor.execute(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+        [table],
+    )
+    row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def _plan_estimate(cursor, queryset):
+    sql, params = queryset.query.sql_with_params()
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(queryset):
+    """
+    Return the Postgres planner's row estimate for ``queryset``.
+
+    Returns None on other database vendors or if no estimate is available.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                estimate = _table_estimate(cursor, queryset.model._meta.db_table)
+                if estimate is not None:
+                    return estimate
+            return _plan_estimate(cursor, queryset)
+    except (DatabaseError, KeyError, IndexError, ValueError) as exc:
+        logger.warning("Could not estimate property count: %s", exc)
+        return None
+
+
+def get_property_count(queryset, shape):
+    """
+    Return ``(count, exact)`` for the filtered ``queryset``.
+
+    ``shape`` is any hashable, canonical description of the filters applied
+    to ``queryset``; it is used as the cache key.
+    """
+    digest = hashlib.md5(repr(shape).encode(), usedforsecurity=False).hexdigest()
+    return get_or_build(
+        versioned_key(COUNT_CACHE_PREFIX, digest),
+        lambda: _compute_count(queryset),
+        COUNT_CACHE_TIMEOUT,
+    )
+
+
+def _compute_count(queryset):
+    threshold = _exact_count_threshold()
+    if threshold is not None:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate > threshold:
+            return estimate, False
+
+    return queryset.count(), True
@@ -0,0 +1,32 @@
+"""
+Fast JSON encoding for property responses.
+
+Uses orjson when it is installed (datetimes are encoded natively, Decimals
+through a tiny ``default`` hook) and falls back to Django's encoder. Both
+follow the ``JsonResponse`` wire format: prices as strings and UTC
+datetimes with a ``Z`` suffix (orjson keeps microsecond precision).
+"""
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(data):
+    """
+    Return ``data`` encoded as UTF-8 JSON bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
@@ -0,0 +1,173 @@
+"""
+Normalized cache of single properties.
+
+Every property is cached twice, outside the generation-versioned namespace
+so entries survive invalidations: its lean list row
+(``DEFAULT_LIST_FIELDS``) under ``property:<id>``, and its detail row (all
+``LISTING_FIELDS``, with the long description) under
+``property_detail:<id>``. Listing pages only cache their ordered ids (see
+``properties.utils``) and read the rows of one kind with a single
+``MGET``; rows missing from the cache are read in one query and stored
+with ``SET NX``. ``refresh_entities``, called after a write commits, always
+overwrites both, so a page build that read a row before the write can
+never store it over the newer one.
+
+A deleted or unknown property is cached as an empty value (a tombstone):
+it is not looked up again, and a racing build cannot bring it back. Rows
+written without signals (bulk imports) must drop theirs with
+``forget_entities``.
+"""
+from itertools import islice
+
+from django.core.cache import cache
+
+from .models import Property
+
+ENTITY_CACHE_PREFIX = "property"
+DETAIL_ENTITY_CACHE_PREFIX = "property_detail"
+ENTITY_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+FORGET_BATCH_SIZE = 1000
+TOMBSTONE = b""
+
+# Every field a client may select with ?fields=, in output order
+LISTING_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "price",
+    "location",
+    "latitude",
+    "longitude",
+    "created_at",
+)
+# Long text is left to the detail endpoint unless asked for
+DEFAULT_LIST_FIELDS = tuple(
+    field for field in LISTING_FIELDS if field != "description"
+)
+
+
+def entity_key(pk, detail=False):
+    prefix = DETAIL_ENTITY_CACHE_PREFIX if detail else ENTITY_CACHE_PREFIX
+    return f"{prefix}:{pk}"
+
+
+def _fields(detail):
+    return LISTING_FIELDS if detail else DEFAULT_LIST_FIELDS
+
+
+def _rows_by_id(rows):
+    return {row["id"]: row for row in rows}
+
+
+def _entity_data(rows, pks, detail):
+    """
+    Return the cache entries for ``rows`` plus tombstones for the ``pks``
+    without a row.
+    """
+    data = {entity_key(pk, detail): row for pk, row in rows.items()}
+    for pk in pks:
+        data.setdefault(entity_key(pk, detail), TOMBSTONE)
+    return data
+
+
+def _split(pks, cached, detail):
+    rows, missing = {}, []
+    for pk in pks:
+        value = cached.get(entity_key(pk, detail))
+        if value is None:
+            missing.append(pk)
+        elif value != TOMBSTONE:
+            rows[pk] = value
+    return rows, missing
+
+
+def store_entities(rows):
+    """
+    Cache the list rows (dicts of ``DEFAULT_LIST_FIELDS``) that are not
+    cached yet.
+    """
+    if rows:
+        cache.add_many(
+            _entity_data(_rows_by_id(rows), (), False), ENTITY_CACHE_TIMEOUT
+        )
+
+
+async def astore_entities(rows):
+    if rows:
+        await cache.aadd_many(
+            _entity_data(_rows_by_id(rows), (), False), ENTITY_CACHE_TIMEOUT
+        )
+
+
+def get_entities(pks, detail=False):
+    """
+    Return ``{pk: row}`` for the properties among ``pks`` that exist: list
+    rows, or detail rows with ``detail``.
+
+    Cached rows come from one ``MGET``; the others from a single query.
+    """
+    cached = cache.get_many([entity_key(pk, detail) for pk in pks])
+    rows, missing = _split(pks, cached, detail)
+    if missing:
+        fetched = _rows_by_id(
+            Property.objects.filter(pk__in=missing).values(*_fields(detail))
+        )
+        cache.add_many(
+            _entity_data(fetched, missing, detail), ENTITY_CACHE_TIMEOUT
+        )
+        rows.update(fetched)
+    return rows
+
+
+async def aget_entities(pks, detail=False):
+    """
+    Async ``get_entities``, through redis.asyncio and the async ORM.
+    """
+    cached = await cache.aget_many([entity_key(pk, detail) for pk in pks])
+    rows, missing = _split(pks, cached, detail)
+    if missing:
+        fetched = _rows_by_id(
+            [
+                row
+                async for row in Property.objects.filter(pk__in=missing).values(
+                    *_fields(detail)
+                )
+            ]
+        )
+        await cache.aadd_many(
+            _entity_data(fetched, missing, detail), ENTITY_CACHE_TIMEOUT
+        )
+        rows.update(fetched)
+    return rows
+
+
+def refresh_entities(pks, using=None):
+    """
+    Overwrite both cached rows of every pk in ``pks`` with the committed
+    ones (or tombstones), with one query and one write, and return
+    ``{pk: detail row}`` for the properties that still exist.
+    """
+    pks = list(pks)
+    rows = _rows_by_id(
+        Property.objects.using(using).filter(pk__in=pks).values(*LISTING_FIELDS)
+    )
+    list_rows = {
+        pk: {field: row[field] for field in DEFAULT_LIST_FIELDS}
+        for pk, row in rows.items()
+    }
+    cache.set_many(
+        {**_entity_data(list_rows, pks, False), **_entity_data(rows, pks, True)},
+        ENTITY_CACHE_TIMEOUT,
+    )
+    return rows
+
+
+def forget_entities(pks):
+    """
+    Drop the cached rows and tombstones of ``pks``, in batches.
+    """
+    pks = iter(pks)
+    while batch := list(islice(pks, FORGET_BATCH_SIZE)):
+        cache.delete_many(
+            [key for pk in batch for key in (entity_key(pk), entity_key(pk, True))]
+        )
@@ -0,0 +1,88 @@
+"""
+Streaming bulk export of properties as NDJSON or CSV.
+
+Rows are read through a server-side cursor (``QuerySet.iterator``) and
+encoded as they arrive, so memory use does not grow with the table. The
+encoded rows are grouped into chunks of roughly ``EXPORT_BUFFER_SIZE``
+bytes to keep the number of socket writes down.
+"""
+import csv
+
+from django.conf import settings
+
+from .encoders import encode_json
+from .models import Property
+from .pagination import KEYSET_ORDERING
+from .utils import LISTING_FIELDS, filter_properties
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class _Echo:
+    """
+    File-like object whose ``write`` returns what it was given.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(query):
+    """
+    Return the rows to export for the filters of ``query`` (no pagination).
+    """
+    properties = filter_properties(Property.objects.all(), query)
+    return (
+        properties.order_by(*KEYSET_ORDERING)
+        .values_list(*LISTING_FIELDS)
+        .iterator(
+            chunk_size=getattr(
+                settings, "PROPERTIES_EXPORT_CHUNK_SIZE", DEFAULT_EXPORT_CHUNK_SIZE
+            )
+        )
+    )
+
+
+def _buffered(chunks):
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield encode_json(dict(zip(LISTING_FIELDS, row))) + b"\n"
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(LISTING_FIELDS).encode()
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in row
+        ).encode()
+
+
+def stream_export(query, export_format):
+    """
+    Yield ``bytes`` chunks of the export of ``query`` in ``export_format``.
+    """
+    rows = export_queryset(query)
+    if export_format == "csv":
+        return _buffered(_csv_lines(rows))
+    return _buffered(_ndjson_lines(rows))
@@ -0,0 +1,241 @@
+"""
+Facet counts (per location and per price bucket) for property_list filters.
+
+The counts of one filter shape come from a single grouped query over
+``(location, price bucket)`` and are kept in a Redis hash with one field
+per cell. Shapes are not part of the generation-versioned namespace:
+instead, every committed Property save or delete adjusts the cells of the
+cached shapes it matches with ``HINCRBY``, so a write does not throw the
+counts away. Shapes with a full-text ``q`` cannot be matched in Python and
+are dropped and rebuilt on the next request instead, as are all shapes
+after a bulk import. Only the ``PROPERTIES_FACET_MAX_SHAPES`` most recently
+requested shapes are kept, so the work of a write stays bounded however
+many filter combinations clients send.
+
+A write that commits while a shape is being rebuilt may be counted twice
+or not at all; ``FACETS_CACHE_TIMEOUT`` bounds how long that can last.
+"""
+import bisect
+import json
+import logging
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Value, When
+from django_redis import get_redis_connection
+
+from .models import Property
+from .utils import ListingQuery, filter_properties, row_matches
+
+logger = logging.getLogger(__name__)
+
+FACETS_CACHE_PREFIX = "properties:facets"
+FACETS_SHAPES_KEY = f"{FACETS_CACHE_PREFIX}:shapes"
+FACETS_PARAMS_KEY = f"{FACETS_CACHE_PREFIX}:params"
+FACETS_CACHE_TIMEOUT = 60 * 30  # 30 minutes
+# Marks a fully built hash; increments never create it
+FACETS_BUILT_FIELD = "_built"
+
+DEFAULT_FACET_PRICE_BUCKETS = (0, 50_000, 100_000, 250_000, 500_000, 1_000_000)
+DEFAULT_FACET_MAX_SHAPES = 500
+FACET_ROW_FIELDS = ("location", "price", "latitude", "longitude")
+
+# Only touches hashes that are still there, so an increment never leaves a
+# partial hash behind
+_INCREMENT_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('HINCRBY', key, ARGV[2 * i - 1], ARGV[2 * i])
+    end
+end
+return 0
+"""
+
+
+def _price_edges():
+    edges = getattr(
+        settings, "PROPERTIES_FACET_PRICE_BUCKETS", DEFAULT_FACET_PRICE_BUCKETS
+    )
+    return tuple(Decimal(edge) for edge in edges)
+
+
+def _max_shapes():
+    return getattr(settings, "PROPERTIES_FACET_MAX_SHAPES", DEFAULT_FACET_MAX_SHAPES)
+
+
+def _bucket_of(price, edges):
+    return max(bisect.bisect_right(edges, Decimal(str(price))) - 1, 0)
+
+
+def _bucket_expression(edges):
+    return Case(
+        *(
+            When(price__lt=edge, then=Value(index))
+            for index, edge in enumerate(edges[1:])
+        ),
+        default=Value(len(edges) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def _cell(location, bucket):
+    return f"{bucket}|{location}"
+
+
+def _facets_key(digest):
+    return f"{FACETS_CACHE_PREFIX}:{digest}"
+
+
+def _shape_digest(query):
+    # Pagination and projection do not change the counts
+    return query._replace(page=1, per_page=0, cursor=None, fields=None).digest
+
+
+# -------------------
+# Building & reading
+# -------------------
+def _compute_cells(query, edges):
+    rows = (
+        filter_properties(Property.objects.all(), query)
+        .order_by()
+        .values("location", bucket=_bucket_expression(edges))
+        .annotate(count=Count("pk"))
+    )
+    return {_cell(row["location"], row["bucket"]): row["count"] for row in rows}
+
+
+def _render(cells, edges):
+    locations = {}
+    buckets = [0] * len(edges)
+    for cell, count in cells.items():
+        if cell == FACETS_BUILT_FIELD or count <= 0:
+            continue
+        bucket, location = cell.split("|", 1)
+        locations[location] = locations.get(location, 0) + count
+        buckets[int(bucket)] += count
+
+    return {
+        "count": sum(buckets),
+        "locations": [
+            {"location": location, "count": count}
+            for location, count in sorted(
+                locations.items(), key=lambda item: (-item[1], item[0])
+            )
+        ],
+        "price_buckets": [
+            {
+                "min": str(edge),
+                "max": str(edges[index + 1]) if index + 1 < len(edges) else None,
+                "count": buckets[index],
+            }
+            for index, edge in enumerate(edges)
+        ],
+    }
+
+
+def get_property_facets(query):
+    """
+    Return location and price-bucket counts for the filters of ``query``.
+    """
+    edges = _price_edges()
+    digest = _shape_digest(query)
+    key = _facets_key(digest)
+    conn = get_redis_connection("default")
+
+    try:
+        cells = conn.hgetall(key)
+    except Exception as exc:
+        logger.warning("Could not read property facets: %s", exc)
+        return _render(_compute_cells(query, edges), edges)
+
+    if cells.get(FACETS_BUILT_FIELD.encode()):
+        conn.zadd(FACETS_SHAPES_KEY, {digest: time.time()})
+        return _render(
+            {cell.decode(): int(count) for cell, count in cells.items()}, edges
+        )
+
+    cells = _compute_cells(query, edges)
+    pipe = conn.pipeline()
+    pipe.delete(key)
+    pipe.hset(key, mapping={FACETS_BUILT_FIELD: 1, **cells})
+    pipe.expire(key, FACETS_CACHE_TIMEOUT)
+    pipe.hset(FACETS_PARAMS_KEY, digest, json.dumps(query.to_params()))
+    pipe.zadd(FACETS_SHAPES_KEY, {digest: time.time()})
+    pipe.execute()
+    return _render(cells, edges)
+
+
+# -------------------
+# Incremental updates
+# -------------------
+def facet_row(instance):
+    """
+    Return the fields of ``instance`` that facets depend on.
+    """
+    return {field: getattr(instance, field) for field in FACET_ROW_FIELDS}
+
+
+def apply_facet_change(old, new):
+    """
+    Move a property from the cells of ``old`` to those of ``new`` (either
+    may be None, for a create or a delete) in every cached shape.
+    """
+    conn = get_redis_connection("default")
+    edges = _price_edges()
+    now = time.time()
+
+    # Shapes not requested for a whole TTL have expired; forget them. Past
+    # the cap, drop the least recently requested ones instead of updating.
+    cutoff = now - FACETS_CACHE_TIMEOUT
+    max_shapes = _max_shapes()
+    pipe = conn.pipeline()
+    pipe.zrangebyscore(FACETS_SHAPES_KEY, "-inf", cutoff)
+    pipe.zremrangebyscore(FACETS_SHAPES_KEY, "-inf", cutoff)
+    pipe.zrevrange(FACETS_SHAPES_KEY, max_shapes, -1)
+    pipe.zremrangebyrank(FACETS_SHAPES_KEY, 0, -max_shapes - 1)
+    pipe.zrange(FACETS_SHAPES_KEY, 0, -1)
+    expired, _, evicted, _, digests = pipe.execute()
+    if expired or evicted:
+        pipe = conn.pipeline()
+        pipe.hdel(FACETS_PARAMS_KEY, *expired, *evicted)
+        if evicted:
+            pipe.delete(*(_facets_key(digest.decode()) for digest in evicted))
+        pipe.execute()
+    digests = [digest.decode() for digest in digests]
+    if not digests:
+        return
+
+    params = conn.hmget(FACETS_PARAMS_KEY, digests)
+    keys, args, stale = [], [], []
+    for digest, shape_params in zip(digests, params):
+        if shape_params is None:
+            continue
+        query = ListingQuery.from_params(json.loads(shape_params))
+        if query.q:
+            stale.append(_facets_key(digest))
+            continue
+        for row, delta in ((old, -1), (new, 1)):
+            if row is not None and row_matches(query, row):
+                keys.append(_facets_key(digest))
+                args += [_cell(row["location"], _bucket_of(row["price"], edges)), delta]
+
+    pipe = conn.pipeline()
+    if keys:
+        conn.register_script(_INCREMENT_SCRIPT)(keys=keys, args=args, client=pipe)
+    if stale:
+        pipe.delete(*stale)
+    pipe.execute()
+
+
+def reset_property_facets():
+    """
+    Drop every cached shape; they are rebuilt on their next request.
+    """
+    conn = get_redis_connection("default")
+    digests = conn.zrange(FACETS_SHAPES_KEY, 0, -1)
+    pipe = conn.pipeline()
+    for digest in digests:
+        pipe.delete(_facets_key(digest.decode()))
+    pipe.delete(FACETS_SHAPES_KEY, FACETS_PARAMS_KEY)
+    pipe.execute()
@@ -0,0 +1,203 @@
+"""
+Proximity and bounding-box search without PostGIS.
+
+Every property with coordinates gets a ``geo_cell``: the id of the
+``GEO_CELL_DEGREES`` wide grid cell it lies in, numbered row by row
+(``row * GEO_GRID_COLUMNS + column``), so the cells of one latitude row
+that overlap a box form one contiguous id range. A search turns its
+bounding box into one ``BETWEEN`` range per row, which the btree index on
+``geo_cell`` answers without touching other rows; the exact box and
+great-circle distance checks then only run on the candidates. Boxes
+spanning more than ``MAX_CELL_RANGES`` ranges use a single range over all
+their rows instead, which keeps the SQL small.
+"""
+import math
+
+from django.db.models import F, FloatField, IntegerField, Q, Value
+from django.db.models.functions import (
+    ASin,
+    Cast,
+    Cos,
+    Floor,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
+
+GEO_CELL_DEGREES = 0.1  # about 11 km of latitude
+GEO_GRID_COLUMNS = math.ceil(360 / GEO_CELL_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 1000
+
+# Above this many per-row ranges a box is covered by one range instead
+MAX_CELL_RANGES = 32
+
+
+def geo_cell_expression():
+    """
+    Database expression of the grid cell of ``(latitude, longitude)``.
+    """
+    return Cast(
+        Floor((F("latitude") + 90.0) / GEO_CELL_DEGREES) * GEO_GRID_COLUMNS
+        + Floor((F("longitude") + 180.0) / GEO_CELL_DEGREES),
+        output_field=IntegerField(),
+    )
+
+
+# Same arithmetic as geo_cell_expression, so both agree on cell borders.
+# Longitude 180 spills into the next row's first cell; the exact coordinate
+# check drops anything the cell ranges pick up by mistake.
+def _row(latitude):
+    return math.floor((latitude + 90.0) / GEO_CELL_DEGREES)
+
+
+def _column(longitude):
+    return math.floor((longitude + 180.0) / GEO_CELL_DEGREES)
+
+
+def _floats(value, count):
+    try:
+        numbers = [float(part) for part in str(value).split(",")]
+    except ValueError:
+        return None
+    if len(numbers) != count or not all(math.isfinite(n) for n in numbers):
+        return None
+    return numbers
+
+
+def parse_point(value):
+    """
+    Return ``(lat, lng)`` from ``"lat,lng"``, or None if it is invalid.
+    """
+    numbers = _floats(value, 2)
+    if numbers is None:
+        return None
+    lat, lng = numbers
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def parse_bbox(value):
+    """
+    Return ``(min_lat, min_lng, max_lat, max_lng)`` from the same
+    comma-separated string, or None if it is invalid. ``min_lng`` may be
+    greater than ``max_lng`` for a box crossing the antimeridian.
+    """
+    numbers = _floats(value, 4)
+    if numbers is None:
+        return None
+    min_lat, min_lng, max_lat, max_lng = numbers
+    if not (-90 <= min_lat <= max_lat <= 90):
+        return None
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        return None
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def radius_bbox(lat, lng, radius_km):
+    """
+    Return the bounding box of the circle of ``radius_km`` around a point.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+
+    # The widest parallel of the circle is the one closest to a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlng = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(widest)))
+    if dlng >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+
+    min_lng, max_lng = lng - dlng, lng + dlng
+    if min_lng < -180.0:
+        min_lng += 360.0
+    if max_lng > 180.0:
+        max_lng -= 360.0
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _longitude_spans(min_lng, max_lng):
+    if min_lng <= max_lng:
+        return [(min_lng, max_lng)]
+    return [(min_lng, 180.0), (-180.0, max_lng)]
+
+
+def bbox_filter(bbox):
+    """
+    Return a ``Q`` selecting the properties inside ``bbox``: the covering
+    ``geo_cell`` ranges plus the exact coordinate bounds.
+    """
+    min_lat, min_lng, max_lat, max_lng = bbox
+    spans = _longitude_spans(min_lng, max_lng)
+    rows = range(_row(min_lat), _row(max_lat) + 1)
+
+    cells = Q()
+    if len(rows) * len(spans) > MAX_CELL_RANGES:
+        # Whole rows from the first to the last; the exact bounds do the rest
+        cells = Q(
+            geo_cell__range=(
+                rows[0] * GEO_GRID_COLUMNS,
+                (rows[-1] + 1) * GEO_GRID_COLUMNS,
+            )
+        )
+    else:
+        for row in rows:
+            for lo, hi in spans:
+                cells |= Q(
+                    geo_cell__range=(
+                        row * GEO_GRID_COLUMNS + _column(lo),
+                        row * GEO_GRID_COLUMNS + _column(hi),
+                    )
+                )
+
+    longitudes = Q()
+    for lo, hi in spans:
+        longitudes |= Q(longitude__gte=lo, longitude__lte=hi)
+
+    return cells & Q(latitude__gte=min_lat, latitude__lte=max_lat) & longitudes
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance between two points in km, in Python.
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    haversine = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(haversine), 1.0))
+
+
+def distance_km(lat, lng):
+    """
+    Database expression of the great-circle distance to ``(lat, lng)`` in km.
+    """
+    lat_rad = math.radians(lat)
+    dlat = (Radians(F("latitude")) - Value(lat_rad)) / 2.0
+    dlng = (Radians(F("longitude")) - Value(math.radians(lng))) / 2.0
+    haversine = Power(Sin(dlat), 2) + Value(math.cos(lat_rad)) * Cos(
+        Radians(F("latitude"))
+    ) * Power(Sin(dlng), 2)
+    # LEAST guards against rounding just above 1
+    return Value(2 * EARTH_RADIUS_KM) * ASin(
+        Least(Sqrt(haversine), Value(1.0)), output_field=FloatField()
+    )
+
+
+def filter_near(queryset, lat, lng, radius_km):
+    """
+    Keep the properties within ``radius_km`` of ``(lat, lng)``.
+    """
+    return (
+        queryset.filter(bbox_filter(radius_bbox(lat, lng, radius_km)))
+        .alias(distance_km=distance_km(lat, lng))
+        .filter(distance_km__lte=radius_km)
+    )
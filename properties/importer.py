@@ -0,0 +1,239 @@
+"""
+Bulk import of properties from CSV or NDJSON feeds (title, description,
+price, location and optional latitude/longitude).
+
+Rows are parsed lazily and written in batches, either with ``bulk_create``
+or, on Postgres with psycopg 3, with ``COPY ... FROM STDIN``. The whole
+import runs in one transaction inside ``deferred_cache_invalidation``, so
+the properties cache is invalidated (and a warm-up scheduled) once after
+the commit instead of once per row. Entity cache entries of the new ids
+(tombstones left by earlier lookups) are dropped after the commit too.
+"""
+import csv
+import io
+import json
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .entities import forget_entities
+from .facets import reset_property_facets
+from .geo import parse_point
+from .models import Property
+from .signals import deferred_cache_invalidation, properties_changed
+
+DEFAULT_IMPORT_BATCH_SIZE = 5000
+IMPORT_FIELDS = (
+    "title", "description", "price", "location", "latitude", "longitude",
+)
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_METHODS = ("auto", "bulk_create", "copy")
+
+
+class PropertyImportError(ValueError):
+    pass
+
+
+class ImportResult(namedtuple("ImportResult", "rows seconds method")):
+    __slots__ = ()
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def detect_format(name):
+    """
+    Guess the feed format from a file name (``.csv``, ``.ndjson``, ``.jsonl``).
+    """
+    if name.lower().endswith(".csv"):
+        return "csv"
+    if name.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def _read_csv(stream):
+    for line, record in enumerate(csv.DictReader(stream), start=2):
+        yield line, record
+
+
+def _read_ndjson(stream):
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            raise PropertyImportError(f"Line {line}: invalid JSON ({exc})") from exc
+        if not isinstance(record, dict):
+            raise PropertyImportError(f"Line {line}: expected a JSON object")
+        yield line, record
+
+
+def _price(line, value):
+    field = Property._meta.get_field("price")
+    try:
+        price = Decimal(str(value).strip()).quantize(
+            Decimal(1).scaleb(-field.decimal_places)
+        )
+    except InvalidOperation as exc:
+        raise PropertyImportError(f"Line {line}: invalid price") from exc
+    if not price.is_finite():
+        raise PropertyImportError(f"Line {line}: invalid price")
+    # COPY would only fail on it later, without a line number
+    if price.adjusted() >= field.max_digits - field.decimal_places:
+        raise PropertyImportError(
+            f"Line {line}: price has more than "
+            f"{field.max_digits - field.decimal_places} integer digits"
+        )
+    return price
+
+
+def _text(line, record, field):
+    value = str(record[field]).strip()
+    max_length = Property._meta.get_field(field).max_length
+    # Like the price, COPY would only reject it later, without a line number
+    if len(value) > max_length:
+        raise PropertyImportError(
+            f"Line {line}: {field} is longer than {max_length} characters"
+        )
+    return value
+
+
+def _clean(line, record):
+    missing = [field for field in ("title", "price", "location") if not record.get(field)]
+    if missing:
+        raise PropertyImportError(f"Line {line}: missing {', '.join(missing)}")
+
+    return (
+        _text(line, record, "title"),
+        str(record.get("description") or ""),
+        _price(line, record["price"]),
+        _text(line, record, "location"),
+    ) + _coordinates(line, record)
+
+
+def _coordinates(line, record):
+    latitude, longitude = record.get("latitude"), record.get("longitude")
+    if latitude in (None, "") and longitude in (None, ""):
+        return None, None
+    point = parse_point(f"{latitude},{longitude}")
+    if point is None:
+        raise PropertyImportError(f"Line {line}: invalid latitude/longitude")
+    return point
+
+
+def iter_rows(stream, import_format):
+    """
+    Yield cleaned ``IMPORT_FIELDS`` tuples from a text ``stream``.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise PropertyImportError(f"Unsupported format: {import_format}")
+    reader = _read_csv if import_format == "csv" else _read_ndjson
+    for line, record in reader(stream):
+        yield _clean(line, record)
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def _bulk_create(rows, batch_size, using):
+    created = 0
+    for batch in _batches(rows, batch_size):
+        Property.objects.using(using).bulk_create(
+            Property(**dict(zip(IMPORT_FIELDS, row))) for row in batch
+        )
+        created += len(batch)
+    return created
+
+
+def _copy(rows, connection):
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field) for field in IMPORT_FIELDS + ("created_at",))
+    sql = f"COPY {quote(Property._meta.db_table)} ({columns}) FROM STDIN"
+    # auto_now_add, as bulk_create would apply it
+    created_at = timezone.now()
+
+    created = 0
+    with connection.cursor() as cursor:
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row + (created_at,))
+                created += 1
+    return created
+
+
+def _max_pk(using):
+    return Property.objects.using(using).aggregate(Max("pk"))["pk__max"] or 0
+
+
+def _supports_copy(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        # psycopg 3 cursors have copy(); psycopg2 ones do not
+        return hasattr(cursor.cursor, "copy")
+
+
+def import_properties(
+    source,
+    import_format=None,
+    batch_size=DEFAULT_IMPORT_BATCH_SIZE,
+    method="auto",
+):
+    """
+    Import properties from ``source`` (a path or a text stream).
+
+    ``import_format`` is ``"csv"`` or ``"ndjson"`` and is guessed from the
+    file name when omitted (CSV for streams). ``method`` is
+    ``"bulk_create"``, ``"copy"`` or ``"auto"`` (COPY when available).
+    Returns an ``ImportResult``; a bad row raises ``PropertyImportError``
+    and nothing is imported.
+    """
+    if method not in IMPORT_METHODS:
+        raise PropertyImportError(f"Unsupported method: {method}")
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        import_format = import_format or detect_format(str(source))
+        with open(source, newline="", encoding="utf-8") as stream:
+            return import_properties(stream, import_format, batch_size, method)
+    if isinstance(source, io.BufferedIOBase):
+        source = io.TextIOWrapper(source, encoding="utf-8", newline="")
+
+    using = router.db_for_write(Property)
+    connection = connections[using]
+    if method == "auto":
+        method = "copy" if _supports_copy(connection) else "bulk_create"
+    elif method == "copy" and not _supports_copy(connection):
+        raise PropertyImportError("COPY needs Postgres with psycopg 3")
+
+    rows = iter_rows(source, import_format or "csv")
+    started = time.perf_counter()
+    with deferred_cache_invalidation():
+        with transaction.atomic(using=using):
+            # New ids are all above it; the range may also cover ids other
+            # writers took meanwhile, whose entries are dropped harmlessly
+            first_pk = _max_pk(using) + 1
+            if method == "copy":
+                created = _copy(rows, connection)
+            else:
+                created = _bulk_create(rows, batch_size, using)
+            last_pk = _max_pk(using) if created else 0
+        if created:
+            properties_changed()
+            # bulk_create/COPY send no per-row signals to count in facets
+            # or to refresh cached rows with
+            transaction.on_commit(reset_property_facets, using=using)
+            transaction.on_commit(
+                lambda: forget_entities(range(first_pk, last_pk + 1)), using=using
+            )
+
+    return ImportResult(created, time.perf_counter() - started, method)
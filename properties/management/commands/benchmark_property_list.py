@@ -0,0 +1,332 @@
+import itertools
+import json
+import platform
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from properties.benchmarks import (
+    http_get,
+    invalidation_storm,
+    local_server,
+    query_mix,
+    run_threaded,
+    seed_properties,
+    summarize,
+)
+from properties.cache import invalidate_properties_cache
+from properties.facets import reset_property_facets
+from properties.metrics import registry
+from properties.models import Property
+from properties.utils import ListingQuery, get_all_properties
+
+TRANSPORTS = ("client", "server", "function")
+SCENARIOS = ("cold", "warm", "storm")
+DEFAULT_SIZES = "10000,100000,1000000"
+
+# Cache key family each transport reads through
+TRANSPORT_FAMILIES = {
+    "client": "property_list_json",
+    "server": "property_list_json",
+    "function": "all_properties",
+}
+
+
+def _ints(value):
+    try:
+        return sorted({int(part) for part in value.split(",") if part.strip()})
+    except ValueError as exc:
+        raise CommandError(f"Not a list of integers: {value!r}") from exc
+
+
+def _choices(value, choices):
+    names = [part.strip() for part in value.split(",") if part.strip()]
+    unknown = set(names) - set(choices)
+    if unknown:
+        raise CommandError(
+            f"Unknown value(s) {', '.join(sorted(unknown))}; "
+            f"choose from {', '.join(choices)}"
+        )
+    return names
+
+
+class _SQLCounter:
+    """
+    ``execute_wrapper`` counting the queries of every thread it wraps.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _delta(before, after, name, **labels):
+    total = 0
+    for (metric, metric_labels), value in after.items():
+        if metric != name or not set(labels.items()) <= set(metric_labels):
+            continue
+        total += value - before.get((metric, metric_labels), 0)
+    return total
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the property listing on 10k/100k/1M synthetic properties: "
+        "property_list through the test client and over a local threaded "
+        "server, and get_all_properties called directly, each with a cold "
+        "cache, a warm cache and under an invalidation storm. Reports "
+        "p50/p95/p99 latency, SQL queries per request and cache hit ratio, "
+        "and can write the results as JSON for regression tracking. Run it "
+        "with alx_backend_caching_property_listings.settings_benchmark to "
+        "use a local Postgres and Redis, or fakeredis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default=DEFAULT_SIZES,
+            help=f"Table sizes to benchmark, smallest first (default: {DEFAULT_SIZES}).",
+        )
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--shapes", type=int, default=200,
+            help="Distinct query shapes the requests are drawn from.",
+        )
+        parser.add_argument(
+            "--transports", default="client,server",
+            help=f"Comma-separated subset of {', '.join(TRANSPORTS)}.",
+        )
+        parser.add_argument(
+            "--scenarios", default=",".join(SCENARIOS),
+            help=f"Comma-separated subset of {', '.join(SCENARIOS)}.",
+        )
+        parser.add_argument(
+            "--storm-interval", type=float, default=0.05,
+            help="Seconds between invalidations in the storm scenario.",
+        )
+        parser.add_argument(
+            "--reset", action="store_true",
+            help="Delete every property before seeding the first size.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--output", default=None,
+            help="Write the results as JSON to this file, or - for stdout.",
+        )
+
+    # -------------------
+    # Data
+    # -------------------
+    def _reset(self):
+        table = Property._meta.db_table
+        connection.ops.execute_sql_flush(
+            connection.ops.sql_flush(no_style(), [table], reset_sequences=True)
+        )
+
+    def _grow_to(self, size, seed):
+        current = Property.objects.count()
+        if current > size:
+            return current
+        if current < size:
+            # Offset the seed so topping up does not repeat earlier rows
+            seed_properties(size - current, seed=seed + current)
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {Property._meta.db_table}")
+            # bulk_create sends no signals
+            invalidate_properties_cache()
+            reset_property_facets()
+        return size
+
+    # -------------------
+    # Transports
+    # -------------------
+    def _transports(self, names, server_url, sql_counter):
+        calls = {}
+        if "client" in names:
+            client = Client()
+            base = reverse("property-list")
+            calls["client"] = lambda qs: client.get(f"{base}?{qs}").status_code
+        if "server" in names:
+            base = server_url + reverse("property-list")
+            calls["server"] = lambda qs: http_get(f"{base}?{qs}")
+        if "function" in names:
+
+            def call_function(qs):
+                query = ListingQuery.from_params(
+                    dict(parse_qsl(qs, keep_blank_values=True))
+                )
+                with connection.execute_wrapper(sql_counter):
+                    get_all_properties(query)
+                return 200
+
+            calls["function"] = call_function
+        return calls
+
+    def _run(self, transport, call, scenario, mix, options, sql_counter):
+        if scenario == "cold":
+            invalidate_properties_cache()
+        else:
+            for qs in dict.fromkeys(mix):
+                call(qs)
+
+        positions = itertools.count()
+        errors = []
+
+        def one():
+            status = call(mix[next(positions) % len(mix)])
+            if status != 200:
+                errors.append(status)
+
+        before = registry.snapshot()
+        sql_before = sql_counter.count
+        invalidations = 0
+        if scenario == "storm":
+            with invalidation_storm(options["storm_interval"]) as storm:
+                samples, wall = run_threaded(
+                    one, options["requests"], options["concurrency"]
+                )
+            invalidations = storm["invalidations"]
+        else:
+            samples, wall = run_threaded(
+                one, options["requests"], options["concurrency"]
+            )
+        after = registry.snapshot()
+
+        # Views are counted by RequestMetricsMiddleware, direct calls here
+        if transport == "function":
+            sql = sql_counter.count - sql_before
+        else:
+            sql = _delta(before, after, "http_request_sql_queries_sum")
+
+        stats = summarize(samples)
+        stats.pop("n")
+        family = TRANSPORT_FAMILIES[transport]
+        hits = _delta(before, after, "cache_l1_hits", family=family) + _delta(
+            before, after, "cache_l2_hits", family=family
+        )
+        misses = _delta(before, after, "cache_misses", family=family)
+
+        return {
+            "transport": transport,
+            "scenario": scenario,
+            "requests": len(samples),
+            "concurrency": options["concurrency"],
+            "errors": len(errors),
+            "wall_seconds": round(wall, 4),
+            "requests_per_second": round(len(samples) / wall, 2) if wall else None,
+            **{key: round(value, 3) for key, value in stats.items()},
+            "sql_per_request": round(sql / len(samples), 3) if samples else None,
+            "cache_hits": int(hits),
+            "cache_misses": int(misses),
+            "cache_hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "invalidations": invalidations,
+        }
+
+    # -------------------
+    # Report
+    # -------------------
+    def _write_header(self):
+        header = (
+            f"{'rows':>9} {'transport':<9} {'scenario':<8} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>8} "
+            f"{'hit ratio':>9} {'inval':>6} {'errors':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+    def _write_result(self, result):
+        hit_ratio = result["cache_hit_ratio"]
+        self.stdout.write(
+            f"{result['rows']:>9} {result['transport']:<9} "
+            f"{result['scenario']:<8} {result['requests_per_second'] or 0:>8.0f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['sql_per_request'] or 0:>8.2f} "
+            f"{'-' if hit_ratio is None else f'{hit_ratio:.2%}':>9} "
+            f"{result['invalidations']:>6} {result['errors']:>6}"
+        )
+
+    def _write_output(self, path, report, stdout):
+        payload = json.dumps(report, indent=2)
+        if path == "-":
+            stdout.write(payload)
+            return
+        with open(path, "w") as output:
+            output.write(payload + "\n")
+        self.stderr.write(f"Results written to {path}")
+
+    def handle(self, *args, **options):
+        sizes = _ints(options["sizes"])
+        transports = _choices(options["transports"], TRANSPORTS)
+        scenarios = _choices(options["scenarios"], SCENARIOS)
+        if not sizes or not transports or not scenarios:
+            raise CommandError("Nothing to benchmark")
+        # Keep the table off stdout when the JSON goes there
+        stdout = self.stdout
+        if options["output"] == "-":
+            self.stdout = self.stderr
+
+        sql_counter = _SQLCounter()
+        mix = query_mix(
+            options["requests"],
+            options["shapes"],
+            seed=options["seed"],
+            search=connection.vendor == "postgresql",
+        )
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "cache_backend": settings.CACHES["default"]["BACKEND"],
+            },
+            "options": {
+                key: options[key]
+                for key in (
+                    "requests", "concurrency", "shapes", "storm_interval", "seed",
+                )
+            },
+            "results": [],
+        }
+
+        if options["reset"]:
+            self._reset()
+
+        with local_server() if "server" in transports else nullcontext() as url:
+            calls = self._transports(transports, url, sql_counter)
+            self._write_header()
+            for size in sizes:
+                rows = self._grow_to(size, options["seed"])
+                if rows != size:
+                    self.stderr.write(
+                        f"Skipping {size} rows: the table already has {rows} "
+                        "(use --reset)."
+                    )
+                    continue
+                for transport in transports:
+                    for scenario in scenarios:
+                        result = self._run(
+                            transport, calls[transport], scenario, mix,
+                            options, sql_counter,
+                        )
+                        result = {"rows": rows, **result}
+                        report["results"].append(result)
+                        self._write_result(result)
+
+        if options["output"]:
+            self._write_output(options["output"], report, stdout)
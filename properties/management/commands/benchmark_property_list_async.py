@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from properties.benchmarks import run_async, run_threaded, seed_properties, summarize
+from properties.cache import invalidate_properties_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync property_list (requests on a thread pool, as under "
+        "WSGI or sync_to_async) with property_list_async (requests as "
+        "concurrent tasks on one event loop) under the same load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--query", default="",
+            help="Query string sent with every request, e.g. 'location=lagos'.",
+        )
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Invalidate the properties cache before each run.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Insert this many synthetic properties first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self.stdout.write(f"Seeded {seed_properties(options['seed'])} properties.")
+
+        suffix = f"?{options['query']}" if options["query"] else ""
+        requests = options["requests"]
+        concurrency = options["concurrency"]
+
+        sync_client = Client()
+        async_client = AsyncClient()
+        sync_url = reverse("property-list") + suffix
+        async_url = reverse("property-list-async") + suffix
+
+        runs = {
+            "sync (threads)": lambda: run_threaded(
+                lambda: sync_client.get(sync_url), requests, concurrency
+            ),
+            "async (event loop)": lambda: run_async(
+                lambda: async_client.get(async_url), requests, concurrency
+            ),
+        }
+
+        self.stdout.write(
+            f"{requests} requests, concurrency {concurrency}, "
+            f"{'cold' if options['cold'] else 'warm'} cache\n"
+        )
+        header = (
+            f"{'view':<20} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'p99 ms':>9}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+        for name, run in runs.items():
+            if options["cold"]:
+                invalidate_properties_cache()
+            samples, wall = run()
+            stats = summarize(samples)
+            self.stdout.write(
+                f"{name:<20} {requests / wall:>9.0f} {stats['mean_ms']:>9.2f} "
+                f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                f"{stats['p99_ms']:>9.2f}"
+            )
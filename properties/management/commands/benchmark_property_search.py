@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
+
+from properties.benchmarks import seed_properties, summarize, time_calls
+from properties.models import Property
+from properties.utils import DEFAULT_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full-text ?q= search against the icontains filters it "
+        "replaces. Each path fetches the first page of ids straight from the "
+        "database, bypassing the cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("term", nargs="?", default="beach")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Insert this many synthetic properties first.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Full-text search requires PostgreSQL.")
+
+        if options["seed"]:
+            created = seed_properties(options["seed"])
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Property._meta.db_table}")
+            self.stdout.write(f"Seeded {created} properties.")
+
+        term = options["term"]
+        search_query = SearchQuery(term, search_type="websearch", config="english")
+
+        paths = {
+            "location__icontains": Property.objects.filter(
+                location__icontains=term
+            ),
+            "icontains title/description/location": Property.objects.filter(
+                Q(title__icontains=term)
+                | Q(description__icontains=term)
+                | Q(location__icontains=term)
+            ),
+            "full-text ?q= (ranked)": Property.objects.filter(
+                search_vector=search_query
+            )
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-id"),
+        }
+
+        self.stdout.write(
+            f"{Property.objects.count()} properties, term={term!r}, "
+            f"{options['iterations']} iterations\n"
+        )
+        header = f"{'path':<40} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+        for name, queryset in paths.items():
+            page = queryset.values_list("id", flat=True)[:DEFAULT_PER_PAGE]
+            stats = summarize(time_calls(lambda: list(page.all()), options["iterations"]))
+            self.stdout.write(
+                f"{name:<40} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} "
+                f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+            )
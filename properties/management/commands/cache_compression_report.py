@@ -0,0 +1,114 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from properties.cache_backends import ThresholdCompressor
+
+
+def _key_family(key):
+    # Django keys look like "<KEY_PREFIX>:<version>:<key>"; the family is the
+    # first segment of <key>, e.g. "property_list_json" or "all_properties".
+    parts = key.decode(errors="replace").split(":", 2)
+    return parts[-1].split(":", 1)[0] or "<root>"
+
+
+class Command(BaseCommand):
+    help = (
+        "Sample cached values per key family and report their compression "
+        "ratio and the CPU cost of decompressing them on each hit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sample", type=int, default=200,
+            help="Values to sample per key family (default: 200).",
+        )
+        parser.add_argument(
+            "--max-keys", type=int, default=10000,
+            help="Stop scanning after this many keys (default: 10000).",
+        )
+        parser.add_argument(
+            "--codec",
+            help="Codec used to estimate savings for uncompressed values "
+                 "(default: the configured COMPRESS_CODEC).",
+        )
+
+    def handle(self, *args, **options):
+        cache_options = dict(settings.CACHES["default"].get("OPTIONS", {}))
+        if options["codec"]:
+            cache_options["COMPRESS_CODEC"] = options["codec"]
+        # Estimate what compressing every sampled value would give
+        cache_options["COMPRESS_MIN_LENGTH"] = 0
+        compressor = ThresholdCompressor(cache_options)
+
+        conn = get_redis_connection("default")
+        stats = defaultdict(lambda: defaultdict(float))
+
+        for scanned, key in enumerate(conn.scan_iter(count=1000), start=1):
+            if scanned > options["max_keys"]:
+                break
+            family = _key_family(key)
+            family_stats = stats[family]
+            if family_stats["sampled"] >= options["sample"]:
+                continue
+
+            try:
+                value = conn.get(key)
+            except ResponseError:
+                # Hashes and sorted sets (metrics, access stats, facets, ...)
+                continue
+            if not isinstance(value, bytes) or value.isdigit():
+                continue
+
+            family_stats["sampled"] += 1
+            family_stats["stored_bytes"] += len(value)
+
+            if value[:1] == ThresholdCompressor.MARKER:
+                started = time.perf_counter()
+                raw = compressor.decompress(value)
+                family_stats["decompress_seconds"] += time.perf_counter() - started
+                family_stats["compressed"] += 1
+                family_stats["raw_bytes"] += len(raw)
+                family_stats["potential_bytes"] += len(value)
+            else:
+                started = time.perf_counter()
+                compressed = compressor.compress(value)
+                family_stats["compress_seconds"] += time.perf_counter() - started
+                family_stats["raw_bytes"] += len(value)
+                family_stats["potential_bytes"] += len(compressed)
+
+        header = (
+            f"{'family':<24} {'sampled':>8} {'compressed':>10} {'avg raw':>10} "
+            f"{'avg stored':>10} {'ratio':>7} {'potential':>9} {'us/hit':>8}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+        for family, family_stats in sorted(stats.items()):
+            sampled = family_stats["sampled"]
+            if not sampled:
+                continue
+            compressed = family_stats["compressed"]
+            ratio = family_stats["raw_bytes"] / family_stats["stored_bytes"]
+            potential = family_stats["raw_bytes"] / max(
+                family_stats["potential_bytes"], 1
+            )
+            per_hit = 0
+            if compressed:
+                per_hit = family_stats["decompress_seconds"] / compressed * 1e6
+            self.stdout.write(
+                f"{family:<24} {int(sampled):>8} {int(compressed):>10} "
+                f"{family_stats['raw_bytes'] / sampled:>10.0f} "
+                f"{family_stats['stored_bytes'] / sampled:>10.0f} "
+                f"{ratio:>7.2f} {potential:>9.2f} {per_hit:>8.1f}"
+            )
+
+        self.stdout.write(
+            "\nratio: raw/stored size today; potential: raw/compressed size if "
+            "every value of the family were compressed; us/hit: decompression "
+            "time per read of a compressed value."
+        )
@@ -0,0 +1,111 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from properties.benchmarks import seed_properties
+from properties.models import Property
+from properties.utils import LISTING_FIELDS, ListingQuery, listing_queryset
+
+# One entry per canonical filter combination of property_list
+CANONICAL_QUERIES = {
+    "unfiltered": {},
+    "deep page": {"page": "500"},
+    "location": {"location": "lagos"},
+    "min_price": {"min_price": "49000"},
+    "max_price": {"max_price": "1000"},
+    "price range": {"min_price": "1000", "max_price": "1500"},
+    "location + price range": {
+        "location": "lagos", "min_price": "1000", "max_price": "1500",
+    },
+    # A selective term: it is not part of the synthetic vocabulary
+    "search": {"q": "waterfront"},
+    "search + max_price": {"q": "waterfront", "max_price": "1000"},
+    "keyset first page": {"cursor": ""},
+    "keyset + location": {"cursor": "", "location": "lagos"},
+    "near": {"near": "6.5,3.4", "radius_km": "5"},
+    "bbox": {"bbox": "6.4,3.3,6.6,3.5"},
+    "keyset + near": {"cursor": "", "near": "6.5,3.4", "radius_km": "5"},
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _seq_scans(plan, table):
+    """
+    Yield every Seq Scan node on ``table`` in an EXPLAIN (FORMAT JSON) plan.
+    """
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        yield plan
+    for child in plan.get("Plans", ()):
+        yield from _seq_scans(child, table)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the page query of every canonical property_list filter "
+        "combination and fail if any plan sequentially scans the properties "
+        "table. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100_000,
+            help="Synthetic properties to seed before explaining (default: "
+                 "100000). Use 0 to explain against the existing data.",
+        )
+        parser.add_argument(
+            "--verbose-plans", action="store_true",
+            help="Print the full plan of every query.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plan checks require PostgreSQL.")
+
+        try:
+            with transaction.atomic():
+                failures = self._check(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if failures:
+            raise CommandError(
+                "Sequential scan on the properties table for: "
+                + ", ".join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS("All listing query plans use indexes."))
+
+    def _check(self, options):
+        table = Property._meta.db_table
+
+        if options["rows"]:
+            seed_properties(options["rows"])
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {table}")
+        self.stdout.write(f"Explaining against {Property.objects.count()} rows.")
+
+        failures = []
+        for name, params in CANONICAL_QUERIES.items():
+            query = ListingQuery.from_params(params)
+            offset = 0 if query.is_keyset else (query.page - 1) * query.per_page
+            page = listing_queryset(query).values(*LISTING_FIELDS)[
+                offset:offset + query.per_page
+            ]
+            plan = json.loads(page.explain(format="json"))[0]["Plan"]
+            seq_scans = list(_seq_scans(plan, table))
+
+            status = self.style.ERROR("SEQ SCAN") if seq_scans else "ok"
+            self.stdout.write(
+                f"{name:<28} {status:<10} {plan['Node Type']} "
+                f"(cost {plan['Total Cost']:.0f})"
+            )
+            if options["verbose_plans"]:
+                self.stdout.write(page.explain())
+            if seq_scans:
+                failures.append(name)
+
+        return failures
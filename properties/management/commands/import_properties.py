@@ -0,0 +1,66 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.importer import (
+    DEFAULT_IMPORT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    IMPORT_METHODS,
+    PropertyImportError,
+    detect_format,
+    import_properties,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import properties from a CSV or NDJSON file (columns: title, "
+        "description, price, location, optional latitude and longitude) with "
+        "a single cache invalidation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed to import, or - for stdin.")
+        parser.add_argument(
+            "--format", choices=IMPORT_FORMATS, default=None,
+            help="Feed format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--method", choices=IMPORT_METHODS, default="auto",
+            help="Load with bulk_create or Postgres COPY (default: COPY if available).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=DEFAULT_IMPORT_BATCH_SIZE,
+            help="Rows per bulk_create batch.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        import_format = options["format"]
+        if path == "-":
+            if import_format is None:
+                raise CommandError("--format is required when reading stdin")
+            source = sys.stdin
+        else:
+            import_format = import_format or detect_format(path)
+            if import_format is None:
+                raise CommandError(f"Cannot tell the format of {path}, use --format")
+            source = path
+
+        try:
+            result = import_properties(
+                source,
+                import_format=import_format,
+                batch_size=options["batch_size"],
+                method=options["method"],
+            )
+        except (OSError, PropertyImportError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.rows} propert{'y' if result.rows == 1 else 'ies'} "
+                f"with {result.method} in {result.seconds:.2f}s "
+                f"({result.rows_per_second:,.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.warmup import warm_property_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Warm the property listing cache by replaying the configured and "
+        "most requested query shapes through the view's code path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=None,
+            help="Number of query shapes to warm (default: PROPERTIES_WARM_TOP_N).",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Thread pool size (default: PROPERTIES_WARM_WORKERS).",
+        )
+        parser.add_argument(
+            "--no-stats", action="store_true",
+            help="Only warm PROPERTIES_WARM_QUERIES, ignore recorded access stats.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        warmed, failed = warm_property_cache(
+            top_n=options["top"],
+            workers=options["workers"],
+            use_stats=not options["no_stats"],
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Warmed {warmed} property listing(s) in {elapsed:.2f}s"
+                + (f", {failed} failed" if failed else "")
+            )
+        )
@@ -0,0 +1,249 @@
+"""
+In-process metrics for the properties app.
+
+Counters and histograms are sharded per thread: every thread only ever
+writes to its own dict, so recording a sample takes no lock. Readers sum
+the shards when they need a snapshot. The shards of finished threads are
+folded into one dict of retired totals, so thread-per-request servers do
+not pile them up.
+
+``MetricsRegistry.flush`` periodically adds each process' deltas to Redis
+hashes (one per metric name), so ``load`` returns totals across all
+workers and any of them can serve the Prometheus exposition.
+"""
+import bisect
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+# Upper bounds in seconds; samples above the last bound land in "+Inf"
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+METRICS_KEY_PREFIX = "properties:metrics"
+METRIC_NAMES_KEY = f"{METRICS_KEY_PREFIX}:names"
+
+
+@lru_cache(maxsize=None)
+def _bucket_labels(buckets):
+    return tuple(repr(bound) for bound in buckets) + ("+Inf",)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = {}  # thread -> shard
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed = {}
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # Taken once per thread, never on the recording path
+            with self._shards_lock:
+                self._retire_finished_shards()
+                self._shards[threading.current_thread()] = shard
+            return shard
+
+    def _retire_finished_shards(self):
+        # A finished thread never writes again; called with the lock held
+        for thread in [thread for thread in self._shards if not thread.is_alive()]:
+            for key, value in self._shards.pop(thread).items():
+                self._retired[key] = self._retired.get(key, 0) + value
+
+    def inc(self, name, labels=(), amount=1):
+        """
+        Add ``amount`` to the counter ``name`` with ``labels``.
+
+        ``labels`` is a tuple of ``(label, value)`` pairs.
+        """
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        """
+        Record ``value`` in the histogram ``name`` (seconds by default).
+        """
+        shard = self._shard()
+        bucket = _bucket_labels(buckets)[bisect.bisect_left(buckets, value)]
+        for key, amount in (
+            ((f"{name}_bucket", labels + (("le", bucket),)), 1),
+            ((f"{name}_sum", labels), value),
+            ((f"{name}_count", labels), 1),
+        ):
+            shard[key] = shard.get(key, 0) + amount
+
+    def snapshot(self):
+        """
+        Return ``{(name, labels): value}`` summed over all threads.
+
+        Histogram buckets are per bucket, not cumulative.
+        """
+        with self._shards_lock:
+            self._retire_finished_shards()
+            shards = list(self._shards.values())
+            totals = defaultdict(int, self._retired)
+
+        for shard in shards:
+            # dict.copy() is atomic, so a concurrent write can't break it
+            for key, value in shard.copy().items():
+                totals[key] += value
+        return dict(totals)
+
+    def flush(self, conn, make_key):
+        """
+        Add everything recorded since the last flush to the Redis hashes
+        ``properties:metrics:<name>`` (one field per label set).
+        """
+        with self._flush_lock:
+            snapshot = self.snapshot()
+            pipe = conn.pipeline(transaction=False)
+            names = set()
+
+            for (name, labels), value in snapshot.items():
+                delta = value - self._flushed.get((name, labels), 0)
+                if not delta:
+                    continue
+                names.add(name)
+                pipe.hincrbyfloat(
+                    make_key(f"{METRICS_KEY_PREFIX}:{name}"),
+                    json.dumps(labels),
+                    delta,
+                )
+
+            if names:
+                pipe.sadd(make_key(METRIC_NAMES_KEY), *names)
+                pipe.execute()
+            self._flushed = snapshot
+
+    @staticmethod
+    def load(conn, make_key, prefix=""):
+        """
+        Return ``{(name, labels): value}`` flushed by all processes, for the
+        metric names starting with ``prefix``.
+        """
+        names = sorted(
+            name.decode()
+            for name in conn.smembers(make_key(METRIC_NAMES_KEY))
+            if name.decode().startswith(prefix)
+        )
+        pipe = conn.pipeline(transaction=False)
+        for name in names:
+            pipe.hgetall(make_key(f"{METRICS_KEY_PREFIX}:{name}"))
+
+        samples = {}
+        for name, fields in zip(names, pipe.execute()):
+            for labels, value in fields.items():
+                labels = tuple(tuple(pair) for pair in json.loads(labels))
+                samples[(name, labels)] = float(value)
+        return samples
+
+
+registry = MetricsRegistry()
+
+
+# -------------------
+# Prometheus text exposition
+# -------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _histogram_base(name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def _le_key(labels):
+    le = dict(labels)["le"]
+    return float("inf") if le == "+Inf" else float(le)
+
+
+def render_prometheus(samples, namespace="properties", gauges=()):
+    """
+    Render ``{(name, labels): value}`` in the Prometheus text format.
+
+    Names ending in ``_bucket``/``_sum``/``_count`` become histograms (the
+    per-bucket counts are made cumulative), everything else a counter.
+    ``gauges`` is an iterable of ``(name, labels, value)`` rendered as is.
+    """
+    histograms = defaultdict(lambda: defaultdict(dict))
+    counters = defaultdict(dict)
+    for (name, labels), value in samples.items():
+        base = _histogram_base(name)
+        if base is None:
+            counters[name][labels] = value
+        else:
+            histograms[base][name[len(base):]][labels] = value
+
+    lines = []
+    for name in sorted(counters):
+        metric = f"{namespace}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for labels, value in sorted(counters[name].items()):
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+    for base in sorted(histograms):
+        metric = f"{namespace}_{base}"
+        parts = histograms[base]
+        lines.append(f"# TYPE {metric} histogram")
+
+        series = defaultdict(list)
+        for labels, value in parts["_bucket"].items():
+            series[tuple(pair for pair in labels if pair[0] != "le")].append(
+                (labels, value)
+            )
+        for labels in sorted(series):
+            cumulative = 0
+            buckets = sorted(series[labels], key=lambda item: _le_key(item[0]))
+            if _le_key(buckets[-1][0]) != float("inf"):
+                buckets.append((labels + (("le", "+Inf"),), 0))
+            for bucket_labels, value in buckets:
+                cumulative += value
+                le = dict(bucket_labels)["le"]
+                lines.append(
+                    f"{metric}_bucket{_format_labels(labels + (('le', le),))} "
+                    f"{_format_value(cumulative)}"
+                )
+            lines.append(
+                f"{metric}_sum{_format_labels(labels)} "
+                f"{_format_value(parts['_sum'].get(labels, 0))}"
+            )
+            lines.append(
+                f"{metric}_count{_format_labels(labels)} "
+                f"{_format_value(parts['_count'].get(labels, 0))}"
+            )
+
+    gauge_lines = defaultdict(list)
+    for name, labels, value in gauges:
+        gauge_lines[f"{namespace}_{name}"].append(
+            f"{namespace}_{name}{_format_labels(labels)} {_format_value(value)}"
+        )
+    for metric in sorted(gauge_lines):
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(gauge_lines[metric])
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+"""
+Middleware for the properties app.
+
+``RequestMetricsMiddleware`` records latency and status per view plus the
+number of SQL queries and the time spent in them, through a
+``connection.execute_wrapper`` on every configured database. Samples go to
+the lock-free ``properties.metrics`` registry.
+
+``DeferredInvalidationMiddleware`` coalesces the cache invalidations of
+all Property writes made while handling a request into one.
+
+``ReadYourWritesMiddleware`` keeps a client that wrote on the primary
+database for the read-your-writes window, through a cookie (see
+``properties.routers``).
+"""
+import math
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from .metrics import COUNT_BUCKETS, registry
+from .routers import (
+    PRIMARY_COOKIE_NAME,
+    read_your_writes_window,
+    request_wrote,
+    start_request,
+)
+from .signals import deferred_cache_invalidation
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match._func_path
+
+
+class _SyncAndAsyncMiddleware:
+    """
+    Base for middleware that wraps the view in both WSGI and ASGI stacks,
+    so async views are not pushed to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with self.wrap(request) as state:
+            state.response = self.get_response(request)
+        return state.response
+
+    async def __acall__(self, request):
+        with self.wrap(request) as state:
+            state.response = await self.get_response(request)
+        return state.response
+
+
+class _State:
+    response = None
+
+
+class RequestMetricsMiddleware(_SyncAndAsyncMiddleware):
+    @contextmanager
+    def wrap(self, request):
+        state = _State()
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            yield state
+        elapsed = time.perf_counter() - started
+
+        view = (("view", _view_label(request)),)
+        registry.inc(
+            "http_requests",
+            view
+            + (("method", request.method), ("status", str(state.response.status_code))),
+        )
+        registry.observe("http_request_duration_seconds", view, elapsed)
+        registry.observe("http_request_sql_queries", view, timer.count, COUNT_BUCKETS)
+        registry.observe("http_request_sql_seconds", view, timer.seconds)
+
+
+class DeferredInvalidationMiddleware(_SyncAndAsyncMiddleware):
+    @contextmanager
+    def wrap(self, request):
+        with deferred_cache_invalidation():
+            yield _State()
+
+
+def _cookie_pinned_until(request):
+    try:
+        until = float(request.COOKIES.get(PRIMARY_COOKIE_NAME, 0))
+    except ValueError:
+        return 0
+    if not math.isfinite(until):
+        return 0
+    # A forged cookie can at most pin its own client for one window
+    return min(until, time.time() + read_your_writes_window())
+
+
+class ReadYourWritesMiddleware(_SyncAndAsyncMiddleware):
+    @contextmanager
+    def wrap(self, request):
+        state = _State()
+        start_request(_cookie_pinned_until(request))
+        yield state
+        if request_wrote():
+            window = read_your_writes_window()
+            state.response.set_cookie(
+                PRIMARY_COOKIE_NAME,
+                f"{time.time() + window:.3f}",
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="Lax",
+            )
@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Must run before search_vector exists: Postgres refuses to alter
+        # columns that a generated column depends on.
+        migrations.AlterField(
+            model_name='property',
+            name='location',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='title',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('location', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='property_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('location'), name='gin_trgm_ops'), name='property_location_trgm'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_property_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='property',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['created_at', 'id'], name='property_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['location', 'price'], name='property_location_price_idx'),
+        ),
+    ]
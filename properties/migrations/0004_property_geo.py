@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-17
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_property_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='geo_cell',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('latitude'), '+', models.Value(90.0)), '/', models.Value(0.1))), '*', models.Value(3600)), '+', django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('longitude'), '+', models.Value(180.0)), '/', models.Value(0.1)))), output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['geo_cell'], name='property_geo_cell_idx'),
+        ),
+    ]
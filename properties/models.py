@@ -1,4 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
+
+from .geo import geo_cell_expression
+
 
 class Property(models.Model):
     title = models.CharField(max_length=200)
@@ -6,6 +12,46 @@ class Property(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     location = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    # Grid cell of (latitude, longitude) for proximity search, see properties.geo
+    geo_cell = models.GeneratedField(
+        expression=geo_cell_expression(),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+    # Weighted full-text document, maintained by Postgres on every write
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config="english")
+            + SearchVector("location", weight="B", config="english")
+            + SearchVector("description", weight="C", config="english")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        # Deterministic, backed by property_created_id_idx (scanned backwards)
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="property_created_id_idx"
+            ),
+            models.Index(
+                fields=["location", "price"], name="property_location_price_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="property_search_vector_gin"),
+            models.Index(fields=["geo_cell"], name="property_geo_cell_idx"),
+            # Serves location__icontains, which Django compiles to
+            # UPPER("location"::text) LIKE UPPER('%...%')
+            GinIndex(
+                OpClass(Upper("location"), name="gin_trgm_ops"),
+                name="property_location_trgm",
+            ),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
@@ -0,0 +1,117 @@
+"""
+Pagination helpers for the property listing.
+
+In keyset (seek) mode pages are ordered by ``(created_at, id)`` newest
+first. Instead of an ``OFFSET`` the client sends back an opaque, signed
+cursor holding the position of the last row it has seen, so every page
+costs the same no matter how deep it is and no ``COUNT(*)`` is needed.
+"""
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = "properties.pagination.cursor"
+KEYSET_ORDERING = ("-created_at", "-id")
+# Needed for the next cursor whatever fields the caller selects
+KEYSET_FIELDS = ("created_at", "id")
+
+
+class InvalidCursor(Exception):
+    """
+    Raised when a cursor was tampered with or cannot be decoded.
+    """
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator that uses a precomputed row count instead of ``COUNT(*)``.
+
+    The count may be a planner estimate; pages past the real end of the
+    result are then simply empty.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.__dict__["count"] = count
+
+
+def encode_cursor(row):
+    """
+    Return the signed cursor pointing just after ``row``.
+    """
+    return signing.dumps(
+        [row["created_at"].isoformat(), row["id"]], salt=CURSOR_SALT
+    )
+
+
+def decode_cursor(cursor):
+    """
+    Return the ``(created_at, id)`` position stored in ``cursor``.
+    """
+    try:
+        created_at, pk = signing.loads(cursor, salt=CURSOR_SALT)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (signing.BadSignature, TypeError, ValueError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+
+    if created_at is None:
+        raise InvalidCursor("Cursor has no valid timestamp")
+    return created_at, pk
+
+
+def _keyset_queryset(queryset, cursor):
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    return queryset
+
+
+def _keyset_fields(fields):
+    return tuple(fields) + tuple(
+        field for field in KEYSET_FIELDS if field not in fields
+    )
+
+
+def _split_page(rows, per_page, fields):
+    # One extra row tells us whether there is a next page
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = encode_cursor(rows[-1]) if has_next else None
+    extra = [field for field in KEYSET_FIELDS if field not in fields]
+    if extra:
+        rows = [
+            {name: value for name, value in row.items() if name not in extra}
+            for row in rows
+        ]
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor, per_page, fields):
+    """
+    Return ``(rows, next_cursor)`` for the page that follows ``cursor``.
+
+    An empty ``cursor`` starts from the newest row. ``next_cursor`` is None
+    on the last page. The rows hold only ``fields``, even though the
+    cursor columns are always fetched.
+    """
+    queryset = _keyset_queryset(queryset, cursor)
+    rows = list(queryset.values(*_keyset_fields(fields))[: per_page + 1])
+    return _split_page(rows, per_page, fields)
+
+
+async def akeyset_page(queryset, cursor, per_page, fields):
+    """
+    Async ``keyset_page``, fetching the rows through the async ORM.
+    """
+    queryset = _keyset_queryset(queryset, cursor)
+    rows = [
+        row async for row in queryset.values(*_keyset_fields(fields))[: per_page + 1]
+    ]
+    return _split_page(rows, per_page, fields)
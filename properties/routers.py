@@ -0,0 +1,190 @@
+"""
+Read-replica routing.
+
+``ReplicaRouter`` sends reads to one of ``PROPERTIES_READ_REPLICAS`` (aliases
+in ``DATABASES``) and writes to ``default``. Reads go to ``default``
+instead when any of the following holds:
+
+* the client wrote within ``PROPERTIES_READ_YOUR_WRITES_WINDOW`` seconds
+  (``ReadYourWritesMiddleware`` keeps a cookie), or this request or thread
+  already wrote;
+* ``default`` is inside a transaction;
+* for Property reads, any Property write was committed within the window.
+  Those reads are cache rebuilds, and a lagging replica would put old rows
+  in the cache for the whole generation;
+* no replica is healthy.
+
+A replica is probed at most every ``PROPERTIES_REPLICA_HEALTH_INTERVAL``
+seconds per process. It counts as unhealthy if it cannot be queried or if
+it lags behind by more than the window.
+"""
+import logging
+import random
+import threading
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .cache import get_last_modified
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_YOUR_WRITES_WINDOW = 5  # seconds
+DEFAULT_REPLICA_HEALTH_INTERVAL = 5  # seconds
+PRIMARY_COOKIE_NAME = "properties_primary_until"
+
+# Per request/task under ASGI as well, unlike threading.local
+_pinned = Local()
+
+# alias -> (healthy, checked_at), shared by the threads of a process
+_health = {}
+_health_lock = threading.Lock()
+
+# Replay lag in seconds; 0 when caught up or not a replica at all
+_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+    )
+END
+"""
+
+
+def _replicas():
+    return list(getattr(settings, "PROPERTIES_READ_REPLICAS", ()))
+
+
+def read_your_writes_window():
+    return getattr(
+        settings,
+        "PROPERTIES_READ_YOUR_WRITES_WINDOW",
+        DEFAULT_READ_YOUR_WRITES_WINDOW,
+    )
+
+
+def _health_interval():
+    return getattr(
+        settings,
+        "PROPERTIES_REPLICA_HEALTH_INTERVAL",
+        DEFAULT_REPLICA_HEALTH_INTERVAL,
+    )
+
+
+# -------------------
+# Read-your-writes
+# -------------------
+def pin_to_primary(until=None):
+    """
+    Read from ``default`` in the current request or thread until ``until``
+    (a Unix timestamp, default: the end of the window from now).
+    """
+    if until is None:
+        until = time.time() + read_your_writes_window()
+    _pinned.until = max(getattr(_pinned, "until", 0), until)
+
+
+def pinned_to_primary():
+    return getattr(_pinned, "until", 0) > time.time()
+
+
+def start_request(pinned_until=0):
+    """
+    Reset the pinning state for a new request, keeping ``pinned_until``
+    from the client's cookie.
+    """
+    _pinned.until = pinned_until
+    _pinned.wrote = False
+
+
+def request_wrote():
+    return getattr(_pinned, "wrote", False)
+
+
+def _property_written_recently():
+    try:
+        last_modified = get_last_modified()
+    except Exception as exc:
+        logger.warning("Could not read the last Property write: %s", exc)
+        return True
+    # last_modified has a resolution of one second
+    return time.time() - last_modified <= read_your_writes_window() + 1
+
+
+# -------------------
+# Replica health
+# -------------------
+def _probe(alias):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != "postgresql":
+                cursor.execute("SELECT 1")
+                return True
+            cursor.execute(_LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+    except DatabaseError as exc:
+        logger.warning("Read replica %s is unavailable: %s", alias, exc)
+        connection.close()
+        return False
+
+    if lag > read_your_writes_window():
+        logger.warning("Read replica %s lags by %.1fs", alias, lag)
+        return False
+    return True
+
+
+def replica_healthy(alias):
+    """
+    Whether ``alias`` answered its last health probe in time; re-probes it
+    once the result is older than the health interval.
+    """
+    now = time.monotonic()
+    with _health_lock:
+        healthy, checked_at = _health.get(alias, (True, None))
+        if checked_at is not None and now - checked_at < _health_interval():
+            return healthy
+        # Other threads keep the previous result while this one probes
+        _health[alias] = (healthy, now)
+
+    healthy = _probe(alias)
+    with _health_lock:
+        _health[alias] = (healthy, time.monotonic())
+    return healthy
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = _replicas()
+        if not replicas or pinned_to_primary():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label == "properties.Property" and _property_written_recently():
+            return DEFAULT_DB_ALIAS
+
+        healthy = [alias for alias in replicas if replica_healthy(alias)]
+        if not healthy:
+            return DEFAULT_DB_ALIAS
+        return random.choice(healthy)
+
+    def db_for_write(self, model, **hints):
+        _pinned.wrote = True
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as default
+        databases = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        if db in _replicas():
+            return False
+        return None
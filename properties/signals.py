@@ -1,21 +1,249 @@
-from django.db.models.signals import post_save, post_delete
+"""
+Cache invalidation for Property writes.
+
+Invalidation runs only after the writing transaction commits
+(``transaction.on_commit``), so a concurrent reader can never cache rows
+that may still be rolled back, and it is registered at most once per
+transaction. ``deferred_cache_invalidation`` (used per request by
+``DeferredInvalidationMiddleware`` and by the importer) collapses the
+writes of a whole block into one. Commits from many threads that arrive
+while an invalidation is being sent wait for it and share the next one.
+
+Saves and deletes also adjust the cached facet counts after commit (see
+``properties.facets``); updates read the previous row in ``pre_save``.
+
+Every write overwrites the property's entry in the entity cache after
+commit (see ``properties.entities``), batched per transaction or deferred
+block. Updates that cannot change which properties any cached page holds,
+or their order, stop there: they only bump the revision
+(``touch_properties_cache``), and every listing page stays cached.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django.core.cache import cache
 
+from .cache import invalidate_properties_cache, touch_properties_cache
+from .entities import LISTING_FIELDS, refresh_entities
+from .facets import FACET_ROW_FIELDS, apply_facet_change, facet_row
 from .models import Property
+from .utils import listing_changes_affect_cache
+from .warmup import schedule_cache_warmup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INVALIDATION_WINDOW = 0  # seconds
+
+# Per request/task under ASGI as well, unlike threading.local
+_deferred = Local()
+
+
+class _InvalidationBatcher:
+    """
+    Group commit for invalidations. Every caller returns once an
+    invalidation sent after its call has completed. One caller at a time
+    sends, covering every call made until it starts; callers arriving
+    meanwhile wait for it, then one of those not covered sends the next.
+    So no caller waits for more than two invalidations, and a failed one
+    is retried by the next sender.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._requested = 0  # number of calls so far
+        self._sent = 0  # calls covered by a completed invalidation
+        self._sending = False
+
+    def request(self):
+        with self._condition:
+            self._requested += 1
+            ticket = self._requested
+            while self._sending:
+                self._condition.wait()
+                if self._sent >= ticket:
+                    return
+            self._sending = True
+
+        try:
+            window = getattr(
+                settings,
+                "PROPERTIES_INVALIDATION_WINDOW",
+                DEFAULT_INVALIDATION_WINDOW,
+            )
+            if window:
+                time.sleep(window)
+            with self._condition:
+                covered = self._requested
+            invalidate_properties_cache()
+            with self._condition:
+                self._sent = max(self._sent, covered)
+        finally:
+            with self._condition:
+                self._sending = False
+                self._condition.notify_all()
+        # Outside the sending section: queuing may block on the broker
+        schedule_cache_warmup()
+
+
+_batcher = _InvalidationBatcher()
+
+
+def _invalidate_after_commit():
+    _batcher.request()
+
+
+@contextmanager
+def deferred_cache_invalidation():
+    """
+    Collapse the cache invalidations of every Property write in the block
+    into a single one when the outermost block exits.
+    """
+    _deferred.depth = getattr(_deferred, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _deferred.depth -= 1
+        if not _deferred.depth:
+            changes = getattr(_deferred, "entity_changes", None)
+            if changes is not None:
+                _deferred.entity_changes = None
+                transaction.on_commit(changes, using=changes.using)
+            if getattr(_deferred, "pending", None):
+                using, _deferred.pending = _deferred.pending, None
+                properties_changed(using)
+
+
+def properties_changed(using=None):
+    """
+    Invalidate the properties cache namespace and schedule a warm-up once
+    the current transaction on ``using`` commits, or remember to do so if
+    invalidation is currently deferred.
+    """
+    if getattr(_deferred, "depth", 0):
+        _deferred.pending = using or "default"
+        return
+
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block and any(
+        callback[1] is _invalidate_after_commit
+        for callback in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(_invalidate_after_commit, using=using)
+
+
+def _facet_change_after_commit(old, new, using):
+    def apply():
+        try:
+            apply_facet_change(old, new)
+        except Exception as exc:
+            logger.warning("Could not update property facets: %s", exc)
+
+    transaction.on_commit(apply, using=using)
+
+
+class _EntityChanges:
+    """
+    The Property writes of one transaction (or deferred block), applied
+    together once it commits: one refresh of their cached rows, then one
+    revision bump, or one invalidation if an updated property may have
+    moved in or out of a cached page.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.rows_before = {}  # pk -> row before its first update, or None
+        self.invalidating = False  # the namespace is invalidated anyway
+
+    def add(self, pk, old, invalidating):
+        self.rows_before.setdefault(pk, old)
+        self.invalidating = self.invalidating or invalidating
+
+    def __call__(self):
+        try:
+            rows = refresh_entities(self.rows_before, self.using)
+            if self.invalidating:
+                return
+            changes = [(old, rows.get(pk)) for pk, old in self.rows_before.items()]
+            if not any(None in change for change in changes):
+                if not listing_changes_affect_cache(changes):
+                    touch_properties_cache()
+                    return
+        except Exception as exc:
+            logger.warning("Could not refresh cached properties: %s", exc)
+            if self.invalidating:
+                return
+        properties_changed(self.using)
+
+
+def _entity_changed(pk, old, using, invalidating=False):
+    """
+    Queue the cache update of a written Property with the other writes of
+    its transaction, or of the deferred block. ``old`` is its row before an
+    update; ``invalidating`` when the write invalidates the namespace.
+    """
+    if getattr(_deferred, "depth", 0):
+        changes = getattr(_deferred, "entity_changes", None)
+        if changes is None:
+            changes = _deferred.entity_changes = _EntityChanges(using or "default")
+        changes.add(pk, old, invalidating)
+        return
+
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block:
+        for callback in connection.run_on_commit:
+            if isinstance(callback[1], _EntityChanges):
+                callback[1].add(pk, old, invalidating)
+                return
+    changes = _EntityChanges(using)
+    changes.add(pk, old, invalidating)
+    transaction.on_commit(changes, using=using)
+
+
+@receiver(pre_save, sender=Property)
+def remember_property_row(sender, instance, raw, using, **kwargs):
+    """
+    Keep the stored row of an updated Property for post_save
+    """
+    instance._row_before_save = None
+    if instance.pk is None or instance._state.adding or raw:
+        return
+    instance._row_before_save = (
+        Property.objects.using(using)
+        .filter(pk=instance.pk)
+        .values(*LISTING_FIELDS)
+        .first()
+    )
 
 
 @receiver(post_save, sender=Property)
-def invalidate_properties_cache_on_save(sender, instance, **kwargs):
+def invalidate_properties_cache_on_save(sender, instance, created, using, **kwargs):
     """
-    Clear Redis cache when a Property is created or updated
+    Refresh the cached Property, and invalidate the properties cache
+    namespace when it is created or moves in or out of a cached page
     """
-    cache.delete("all_properties")
+    old = getattr(instance, "_row_before_save", None)
+    if created:
+        properties_changed(using)
+    _entity_changed(instance.pk, old, using, invalidating=created)
+    _facet_change_after_commit(
+        old and {field: old[field] for field in FACET_ROW_FIELDS},
+        facet_row(instance),
+        using,
+    )
 
 
 @receiver(post_delete, sender=Property)
-def invalidate_properties_cache_on_delete(sender, instance, **kwargs):
+def invalidate_properties_cache_on_delete(sender, instance, using, **kwargs):
     """
-    Clear Redis cache when a Property is deleted
+    Invalidate the properties cache namespace when a Property is deleted
     """
-    cache.delete("all_properties")
+    properties_changed(using)
+    _entity_changed(instance.pk, None, using, invalidating=True)
+    _facet_change_after_commit(facet_row(instance), None, using)
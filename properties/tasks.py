@@ -0,0 +1,43 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from .utils import ListingQuery, refresh_listing_page
+from .warmup import (
+    DEFAULT_WARM_DEBOUNCE,
+    WARMUP_SCHEDULED_KEY,
+    seconds_since_last_write,
+    warm_property_cache,
+)
+
+
+@shared_task
+def warm_property_cache_task(top_n=None, workers=None, debounce=True):
+    """
+    Warm the property listing cache; with ``debounce`` wait until
+    Property writes have been quiet for ``PROPERTIES_WARM_DEBOUNCE`` seconds.
+    """
+    if debounce:
+        quiet_period = getattr(
+            settings, "PROPERTIES_WARM_DEBOUNCE", DEFAULT_WARM_DEBOUNCE
+        )
+        quiet_for = seconds_since_last_write()
+        if quiet_for is not None and quiet_for < quiet_period:
+            warm_property_cache_task.apply_async(
+                kwargs={"top_n": top_n, "workers": workers},
+                countdown=quiet_period - quiet_for,
+            )
+            return None
+        cache.delete(WARMUP_SCHEDULED_KEY)
+
+    warmed, failed = warm_property_cache(top_n=top_n, workers=workers)
+    return {"warmed": warmed, "failed": failed}
+
+
+@shared_task(ignore_result=True)
+def refresh_listing_page_task(params, generation):
+    """
+    Rebuild a cached listing page that went stale; queued at most once per
+    page by the request that served it stale.
+    """
+    refresh_listing_page(ListingQuery.from_params(params), generation)
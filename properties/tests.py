@@ -0,0 +1,426 @@
+import time
+from decimal import Decimal
+from io import StringIO
+from math import cos, radians
+from unittest import mock, skipUnless
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse_lazy
+
+from . import cache_backends
+from .cache import (
+    GENERATION_CACHE_KEY,
+    get_cache_generation,
+    get_cache_revision,
+    invalidate_properties_cache,
+)
+from .cache_backends import TwoTierRedisCache
+from .entities import LISTING_FIELDS
+from .importer import PropertyImportError, import_properties
+from .models import Property
+from .utils import (
+    ListingQuery,
+    filter_properties,
+    get_all_properties,
+    row_matches,
+)
+
+TEST_CACHE_DB = 15
+
+
+def isolated_caches():
+    """
+    ``CACHES`` with the default cache moved to a Redis database of its own,
+    which tests may flush.
+    """
+    default = settings.CACHES["default"]
+    location = urlsplit(default["LOCATION"])._replace(path=f"/{TEST_CACHE_DB}")
+    return {**settings.CACHES, "default": {**default, "LOCATION": location.geturl()}}
+
+
+@skipUnless(connection.vendor == "postgresql", "Query plans need PostgreSQL")
+class ListingQueryPlanTests(TestCase):
+    def test_canonical_listing_queries_use_indexes(self):
+        output = StringIO()
+        try:
+            call_command("check_property_query_plans", rows=20_000, stdout=output)
+        except CommandError as exc:
+            self.fail(f"{exc}\n{output.getvalue()}")
+
+
+class RowMatchesTests(TestCase):
+    """
+    ``row_matches`` must select exactly what ``filter_properties`` does.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        km_per_degree_lng = 111.195 * cos(radians(6.5))
+        places = [
+            ("Lagos Island", "100.00", 6.45, 3.40),
+            ("LAGOS", "149.99", 6.50, 3.45),
+            ("Ikeja, lagos", "150.00", 6.60, 3.35),
+            ("Abuja", "150.01", 9.05, 7.49),
+            ("Suva", "200.00", -18.14, 178.44),
+            ("Taveuni", "250.00", -16.80, -179.95),
+            ("Apia", "300.00", -13.83, -171.77),
+            ("Nowhere", "99.99", None, None),
+            # Just inside and just outside 10 km of (6.5, 3.4)
+            ("Ring in", "120.00", 6.5 + 9.99 / 111.195, 3.4),
+            ("Ring out", "120.00", 6.5 + 10.01 / 111.195, 3.4),
+            ("Ring east in", "120.00", 6.5, 3.4 + 9.99 / km_per_degree_lng),
+            ("Ring east out", "120.00", 6.5, 3.4 + 10.01 / km_per_degree_lng),
+        ]
+        Property.objects.bulk_create(
+            Property(
+                title=location,
+                description="",
+                price=price,
+                location=location,
+                latitude=latitude,
+                longitude=longitude,
+            )
+            for location, price, latitude, longitude in places
+        )
+
+    def assertAgrees(self, params):
+        query = ListingQuery.from_params(params)
+        expected = set(
+            filter_properties(Property.objects.all(), query).values_list(
+                "id", flat=True
+            )
+        )
+        matched = {
+            row["id"]
+            for row in Property.objects.values(*LISTING_FIELDS)
+            if row_matches(query, row)
+        }
+        self.assertEqual(matched, expected, params)
+
+    def test_location_is_case_insensitive_substring(self):
+        for location in ("lagos", "LaGoS", "ik", "island", "missing"):
+            self.assertAgrees({"location": location})
+
+    def test_price_bounds_are_inclusive(self):
+        self.assertAgrees({"min_price": "150"})
+        self.assertAgrees({"max_price": "149.99"})
+        self.assertAgrees({"min_price": "100", "max_price": "150.00"})
+        self.assertAgrees({"location": "lagos", "max_price": "149.995"})
+
+    def test_price_bounds_round_inwards(self):
+        query = ListingQuery.from_params(
+            {"min_price": "150.005", "max_price": "149.995"}
+        )
+        self.assertEqual((query.min_price, query.max_price), ("150.01", "149.99"))
+        self.assertAgrees({"min_price": "149.985"})
+        self.assertAgrees({"max_price": "150.005"})
+
+    def test_bbox(self):
+        self.assertAgrees({"bbox": "6,3,7,4"})
+        self.assertAgrees({"bbox": "6.45,3.40,6.50,3.45"})
+
+    def test_bbox_crossing_the_antimeridian(self):
+        self.assertAgrees({"bbox": "-20,170,-10,-170"})
+        self.assertAgrees({"bbox": "-20,178,-15,-180"})
+
+    def test_near_uses_great_circle_distance(self):
+        self.assertAgrees({"near": "6.5,3.4", "radius_km": "10"})
+        self.assertAgrees({"near": "-17,179.9", "radius_km": "300"})
+        self.assertAgrees({"near": "-17,179.9", "radius_km": "1000"})
+
+
+@override_settings(CACHES=isolated_caches(), PROPERTIES_WARM_AFTER_WRITES=False)
+class ListingChangeTests(TestCase):
+    """
+    Writes that can change a cached page move the generation; others only
+    the revision.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # No signals: their on_commit callbacks would never run here
+        cls.cheap, cls.dear = Property.objects.bulk_create(
+            [
+                Property(
+                    title="Flat", description="", price="100.00", location="Lagos"
+                ),
+                Property(
+                    title="Villa", description="", price="900.00", location="Abuja"
+                ),
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+        # Cache a page whose filter later writes may cross
+        get_all_properties(ListingQuery.from_params({"max_price": "500"}))
+
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def assertBumps(self, write, generation, revision=True):
+        generation_before = get_cache_generation()
+        revision_before = get_cache_revision()
+        write()
+        self.assertEqual(get_cache_generation() != generation_before, generation)
+        if revision:
+            self.assertNotEqual(get_cache_revision(), revision_before)
+
+    def test_create_moves_the_generation(self):
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                Property.objects.create(
+                    title="Hut", description="", price="50.00", location="Lagos"
+                )
+
+        self.assertBumps(create, generation=True, revision=False)
+
+    def test_update_inside_the_cached_filters_only_moves_the_revision(self):
+        self.cheap.title = "Renamed flat"
+        self.cheap.price = "120.00"
+        self.assertBumps(lambda: self.save(self.cheap), generation=False)
+
+        page = get_all_properties(ListingQuery.from_params({"max_price": "500"}))
+        self.assertEqual([row["title"] for row in page["data"]], ["Renamed flat"])
+
+    def test_updates_of_one_transaction_move_the_revision_once(self):
+        revision_before = get_cache_revision()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for title in ("Flat 2", "Flat 3"):
+                    self.cheap.title = title
+                    self.cheap.save()
+                self.dear.title = "Villa 2"
+                self.dear.save()
+        self.assertEqual(get_cache_revision(), revision_before + 1)
+
+    @override_settings(PROPERTIES_LISTING_MAX_SHAPES=0)
+    def test_update_past_the_shape_cap_moves_the_generation(self):
+        self.cheap.title = "Renamed flat"
+        self.assertBumps(lambda: self.save(self.cheap), generation=True, revision=False)
+
+    def test_update_crossing_a_cached_filter_moves_the_generation(self):
+        self.dear.price = "400.00"
+        self.assertBumps(lambda: self.save(self.dear), generation=True, revision=False)
+
+    def test_text_update_with_a_cached_search_moves_the_generation(self):
+        get_all_properties(ListingQuery.from_params({"q": "villa"}))
+        self.dear.description = "Sea view"
+        self.assertBumps(lambda: self.save(self.dear), generation=True, revision=False)
+
+    def test_delete_moves_the_generation(self):
+        def delete():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cheap.delete()
+
+        self.assertBumps(delete, generation=True, revision=False)
+
+        page = get_all_properties(ListingQuery.from_params({"max_price": "500"}))
+        self.assertEqual(page["data"], [])
+
+
+@override_settings(CACHES=isolated_caches(), PROPERTIES_WARM_AFTER_WRITES=False)
+class ConditionalListingTests(TestCase):
+    """
+    Listing validators come from Redis: a revalidation runs no SQL.
+    """
+
+    url = reverse_lazy("property-list")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.flat, _ = Property.objects.bulk_create(
+            [
+                Property(
+                    title="Flat", description="", price="100.00", location="Lagos"
+                ),
+                Property(
+                    title="Villa", description="", price="900.00", location="Abuja"
+                ),
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.first = self.client.get(self.url)
+        self.assertEqual(self.first.status_code, 200)
+
+    def test_matching_etag_is_not_modified(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=self.first["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.first["ETag"])
+
+    def test_unmodified_since_is_not_modified(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url, HTTP_IF_MODIFIED_SINCE=self.first["Last-Modified"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_touch_only_write_changes_the_etag(self):
+        generation = get_cache_generation()
+        self.flat.title = "Renamed flat"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flat.save()
+        self.assertEqual(get_cache_generation(), generation)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], self.first["ETag"])
+        self.assertIn("Renamed flat", [row["title"] for row in response.json()["data"]])
+
+
+@override_settings(CACHES=isolated_caches(), PROPERTIES_WARM_AFTER_WRITES=False)
+class KeysetPaginationTests(TestCase):
+    url = reverse_lazy("property-list")
+
+    @classmethod
+    def setUpTestData(cls):
+        Property.objects.bulk_create(
+            Property(
+                title=f"Flat {index}", description="", price="100.00", location="Lagos"
+            )
+            for index in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursors_walk_every_row_once_newest_first(self):
+        ids, cursor = [], ""
+        for _ in range(5):
+            body = self.client.get(self.url, {"cursor": cursor, "per_page": 2}).json()
+            ids += [row["id"] for row in body["data"]]
+            cursor = body["next_cursor"]
+            if not body["next"]:
+                break
+        self.assertIsNone(cursor)
+        self.assertEqual(
+            ids,
+            list(
+                Property.objects.order_by("-created_at", "-id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+    def test_tampered_cursor_is_rejected(self):
+        body = self.client.get(self.url, {"cursor": "", "per_page": 2}).json()
+        cursor = body["next_cursor"]
+        tampered = cursor[:-1] + ("A" if cursor[-1] != "A" else "B")
+
+        response = self.client.get(self.url, {"cursor": tampered})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+
+@override_settings(CACHES=isolated_caches())
+class L1InvalidationTests(SimpleTestCase):
+    """
+    A write through one process drops the key from the L1 of the others.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.other = self.other_process_cache()
+
+    def other_process_cache(self):
+        # Its own L1 and listener, as in another process, with an L1 timeout
+        # long enough that only an invalidation drops a key
+        default = settings.CACHES["default"]
+        params = {**default, "OPTIONS": {**default["OPTIONS"], "L1_TIMEOUT": 60}}
+        with mock.patch.dict(cache_backends._process_states, clear=True):
+            other = TwoTierRedisCache(default["LOCATION"], params)
+        # The listener clears the L1 once it is subscribed
+        other._l1.set("probe", 1)
+        other._ensure_threads()
+        self.wait_for_l1_drop(other, "probe")
+        return other
+
+    def wait_for_l1_drop(self, other, l1_key, timeout=2):
+        deadline = time.monotonic() + timeout
+        while other._l1.get(l1_key) is not cache_backends._MISSING:
+            if time.monotonic() > deadline:
+                self.fail(f"{l1_key} is still in the L1")
+            time.sleep(0.01)
+
+    def test_set_elsewhere_drops_the_key(self):
+        cache.set("greeting", "hello")
+        self.assertEqual(self.other.get("greeting"), "hello")
+        self.assertEqual(self.other._l1.get(self.other.make_key("greeting")), "hello")
+
+        cache.set("greeting", "bye")
+        self.wait_for_l1_drop(self.other, self.other.make_key("greeting"))
+        self.assertEqual(self.other.get("greeting"), "bye")
+
+    def test_generation_bump_drops_the_generation(self):
+        generation = get_cache_generation()
+        self.assertEqual(self.other.get(GENERATION_CACHE_KEY), generation)
+
+        invalidate_properties_cache()
+        self.wait_for_l1_drop(self.other, self.other.make_key(GENERATION_CACHE_KEY))
+        self.assertEqual(self.other.get(GENERATION_CACHE_KEY), generation + 1)
+
+
+@override_settings(CACHES=isolated_caches(), PROPERTIES_WARM_AFTER_WRITES=False)
+class ImportValidationTests(TestCase):
+    """
+    Bad rows are rejected with their line number before anything is written.
+    """
+
+    def import_csv(self, *rows):
+        lines = ["title,description,price,location,latitude,longitude", *rows]
+        return import_properties(
+            StringIO("\n".join(lines) + "\n"), "csv", method="bulk_create"
+        )
+
+    def assertRejected(self, message, source, import_format="csv"):
+        with self.assertRaisesMessage(PropertyImportError, message):
+            import_properties(StringIO(source), import_format, method="bulk_create")
+        self.assertFalse(Property.objects.exists())
+
+    def test_valid_rows_are_imported(self):
+        result = self.import_csv(
+            "Flat,,100.5,Lagos,6.5,3.4", "Villa,Sea view,900,Abuja,,"
+        )
+        self.assertEqual(result.rows, 2)
+        self.assertEqual(
+            sorted(Property.objects.values_list("title", "price", "latitude")),
+            [("Flat", Decimal("100.50"), 6.5), ("Villa", Decimal("900.00"), None)],
+        )
+
+    def test_invalid_rows_are_rejected(self):
+        header = "title,description,price,location,latitude,longitude\n"
+        ok = "Flat,,100,Lagos,,\n"
+        long_title, long_location = "x" * 201, "x" * 101
+        cases = [
+            ("Line 3: price has more than 8 integer digits", "Big,,123456789,Lagos,,"),
+            ("Line 3: invalid price", "Huge,,1e999,Lagos,,"),
+            ("Line 3: invalid price", "Odd,,abc,Lagos,,"),
+            ("Line 3: missing title, location", ",,100,,,"),
+            ("Line 3: invalid latitude/longitude", "Far,,100,Lagos,91,0"),
+            ("Line 3: invalid latitude/longitude", "Half,,100,Lagos,6.5,"),
+            ("Line 3: title is longer than 200", f"{long_title},,100,Lagos,,"),
+            ("Line 3: location is longer than 100", f"Flat,,100,{long_location},,"),
+        ]
+        for message, row in cases:
+            with self.subTest(row=row[:40]):
+                self.assertRejected(message, header + ok + row + "\n")
+
+    def test_ndjson_lines_must_be_objects(self):
+        self.assertRejected(
+            "Line 2: expected a JSON object",
+            '{"title": "Flat", "price": "100", "location": "Lagos"}\n[1, 2]\n',
+            "ndjson",
+        )
+        self.assertRejected("Line 1: invalid JSON", "{not json}\n", "ndjson")
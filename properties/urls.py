@@ -1,6 +1,16 @@
 from django.urls import path
-from .views import property_list
+from .views import (
+    property_detail,
+    property_export,
+    property_facets,
+    property_list,
+    property_list_async,
+)
 
 urlpatterns = [
-    path("", property_list),
+    path("", property_list, name="property-list"),
+    path("async", property_list_async, name="property-list-async"),
+    path("export", property_export, name="property-export"),
+    path("facets", property_facets, name="property-facets"),
+    path("<int:pk>", property_detail, name="property-detail"),
 ]
\ No newline at end of file
@@ -1,56 +1,794 @@
+import hashlib
+import json
 import logging
+import math
+from collections import namedtuple
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal, InvalidOperation
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db.models import F
 from django_redis import get_redis_connection
 
+from .cache import (
+    aget_cache_generation,
+    aget_cache_revision,
+    aget_or_build_entry,
+    get_cache_generation,
+    get_cache_revision,
+    get_or_build_entry,
+    refresh_entry,
+    versioned_key,
+)
+from .counts import get_property_count
+from .encoders import encode_json
+from .entities import (
+    DEFAULT_LIST_FIELDS,
+    LISTING_FIELDS,
+    aget_entities,
+    astore_entities,
+    get_entities,
+    store_entities,
+)
+from .geo import (
+    DEFAULT_RADIUS_KM,
+    MAX_RADIUS_KM,
+    bbox_filter,
+    filter_near,
+    haversine_km,
+    parse_bbox,
+    parse_point,
+)
+from .metrics import registry, render_prometheus
 from .models import Property
+from .pagination import (
+    CountedPaginator,
+    akeyset_page,
+    decode_cursor,
+    keyset_page,
+)
 
 logger = logging.getLogger(__name__)
 
+ALL_PROPERTIES_CACHE_PREFIX = "all_properties"
+ALL_PROPERTIES_CACHE_TIMEOUT = 3600  # 1 hour, the hard TTL
+DEFAULT_LISTING_SOFT_TIMEOUT = 60 * 5  # 5 minutes
+# Filters of the pages cached per generation, see listing_changes_affect_cache
+LISTING_SHAPES_PREFIX = "properties:listing_shapes"
+DEFAULT_LISTING_MAX_SHAPES = 500
 
-def get_all_properties():
-    queryset = cache.get("all_properties")
+PROPERTY_LIST_JSON_CACHE_PREFIX = "property_list_json"
+PROPERTY_LIST_JSON_CACHE_TIMEOUT = 60 * 15  # 15 minutes
 
-    if queryset is None:
-        queryset = Property.objects.all()
-        cache.set("all_properties", queryset, 3600)
+PROPERTY_DETAIL_JSON_CACHE_PREFIX = "property_detail_json"
+PROPERTY_DETAIL_JSON_CACHE_TIMEOUT = 60 * 15  # 15 minutes
 
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+
+# Inputs of Property.search_vector
+SEARCH_FIELDS = ("title", "location", "description")
+
+
+def _normalize_price(value, rounding):
+    """
+    Return ``value`` as a two-decimal string, or None if it is not a price.
+
+    ``rounding`` goes towards the inside of the range (``ROUND_CEILING`` for
+    a lower bound, ``ROUND_FLOOR`` for an upper one), so rounding never lets
+    in a price the raw bound excluded.
+    """
+    if value in (None, ""):
+        return None
+    try:
+        price = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    if not price.is_finite():
+        return None
+    try:
+        # Raises for values with more digits than the context precision
+        return str(price.quantize(Decimal("0.01"), rounding=rounding))
+    except InvalidOperation:
+        return None
+
+
+def _normalize_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _normalize_near(params):
+    point = parse_point(params.get("near") or "")
+    if point is None:
+        return None, None
+    try:
+        radius_km = float(params.get("radius_km") or DEFAULT_RADIUS_KM)
+    except ValueError:
+        radius_km = DEFAULT_RADIUS_KM
+    if not math.isfinite(radius_km) or radius_km <= 0:
+        radius_km = DEFAULT_RADIUS_KM
+    radius_km = min(radius_km, MAX_RADIUS_KM)
+    return "{:.5f},{:.5f}".format(*point), f"{radius_km:.3f}"
+
+
+def _normalize_bbox(value):
+    bbox = parse_bbox(value or "")
+    if bbox is None:
+        return None
+    return ",".join(f"{number:.5f}" for number in bbox)
+
+
+def _normalize_fields(value):
+    names = {name.strip().lower() for name in (value or "").split(",")}
+    fields = tuple(
+        field for field in LISTING_FIELDS if field in names or field == "id"
+    )
+    if len(fields) == 1 and "id" not in names:
+        return None
+    if fields == DEFAULT_LIST_FIELDS:
+        return None
+    return ",".join(fields)
+
+
+class ListingQuery(
+    namedtuple(
+        "ListingQuery",
+        "location min_price max_price q page per_page cursor near radius_km bbox "
+        "fields",
+    )
+):
+    """
+    Canonical shape of a property listing request.
+
+    Two requests that select the same rows normalize to the same tuple
+    (case-folded location, two-decimal prices, clamped page size), so they
+    share a single cache entry.
+
+    ``q`` is a full-text search string; in page-number mode its results
+    are ranked by relevance, in keyset mode they keep the keyset order.
+
+    ``near`` (``"lat,lng"`` with ``radius_km``) and ``bbox``
+    (``"min_lat,min_lng,max_lat,max_lng"``) are rounded to 5 decimals; an
+    invalid value is ignored like an invalid price.
+
+    ``fields`` is the ``?fields=`` projection: the known names in
+    ``LISTING_FIELDS`` order, always with ``id``, or None for
+    ``DEFAULT_LIST_FIELDS``. Unknown names are dropped.
+
+    ``cursor`` is None in page-number mode. In keyset mode it holds the
+    signed cursor, or an empty string for the first page; ``page`` is then
+    always 1. An invalid cursor raises ``InvalidCursor``.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_params(cls, params):
+        location = (params.get("location") or "").strip().lower() or None
+        q = " ".join((params.get("q") or "").lower().split()) or None
+        page = max(_normalize_int(params.get("page"), 1), 1)
+        per_page = _normalize_int(params.get("per_page"), DEFAULT_PER_PAGE)
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+
+        cursor = params.get("cursor")
+        if cursor is not None:
+            cursor = cursor.strip()
+            if cursor:
+                decode_cursor(cursor)
+            page = 1
+
+        near, radius_km = _normalize_near(params)
+
+        return cls(
+            location=location,
+            min_price=_normalize_price(params.get("min_price"), ROUND_CEILING),
+            max_price=_normalize_price(params.get("max_price"), ROUND_FLOOR),
+            q=q,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            near=near,
+            radius_km=radius_km,
+            bbox=_normalize_bbox(params.get("bbox")),
+            fields=_normalize_fields(params.get("fields")),
+        )
+
+    def to_params(self):
+        """
+        Return the query string parameters that reproduce this query.
+        """
+        params = {
+            name: str(value)
+            for name, value in self._asdict().items()
+            if value is not None
+        }
+        if self.is_keyset:
+            params.pop("page")
+        return params
+
+    @property
+    def filters(self):
+        return (
+            self.location,
+            self.min_price,
+            self.max_price,
+            self.q,
+            self.near,
+            self.radius_km,
+            self.bbox,
+        )
+
+    @property
+    def projection(self):
+        if self.fields is None:
+            return DEFAULT_LIST_FIELDS
+        return tuple(self.fields.split(","))
+
+    @property
+    def is_keyset(self):
+        return self.cursor is not None
+
+    @property
+    def digest(self):
+        return hashlib.md5(
+            repr(tuple(self)).encode(), usedforsecurity=False
+        ).hexdigest()
+
+
+def _search_query(q):
+    return SearchQuery(q, search_type="websearch", config="english")
+
+
+def filter_properties(queryset, query):
+    """
+    Apply the search, location, price and geo filters of ``query`` to
+    ``queryset``.
+    """
+    if query.near:
+        lat, lng = parse_point(query.near)
+        queryset = filter_near(queryset, lat, lng, float(query.radius_km))
+    if query.bbox:
+        queryset = queryset.filter(bbox_filter(parse_bbox(query.bbox)))
+    if query.q:
+        queryset = queryset.filter(search_vector=_search_query(query.q))
+    if query.location:
+        queryset = queryset.filter(location__icontains=query.location)
+    if query.min_price is not None:
+        queryset = queryset.filter(price__gte=query.min_price)
+    if query.max_price is not None:
+        queryset = queryset.filter(price__lte=query.max_price)
     return queryset
 
 
+def row_matches(query, row):
+    """
+    Whether ``row`` passes the filters of ``query``, by the same rules as
+    ``filter_properties``. ``q`` is not checked; callers handle it.
+    """
+    if query.location and query.location not in row["location"].lower():
+        return False
+    price = Decimal(str(row["price"]))
+    if query.min_price is not None and price < Decimal(query.min_price):
+        return False
+    if query.max_price is not None and price > Decimal(query.max_price):
+        return False
+
+    if query.near or query.bbox:
+        lat, lng = row["latitude"], row["longitude"]
+        if lat is None or lng is None:
+            return False
+        if query.near:
+            near_lat, near_lng = parse_point(query.near)
+            if haversine_km(near_lat, near_lng, lat, lng) > float(query.radius_km):
+                return False
+        if query.bbox:
+            min_lat, min_lng, max_lat, max_lng = parse_bbox(query.bbox)
+            if not min_lat <= lat <= max_lat:
+                return False
+            if min_lng <= max_lng and not min_lng <= lng <= max_lng:
+                return False
+            if min_lng > max_lng and max_lng < lng < min_lng:
+                return False
+    return True
+
+
+def listing_queryset(query):
+    """
+    Return the filtered, ordered queryset ``property_list`` pages through.
+
+    Full-text searches in page-number mode are ordered by rank; everything
+    else uses the model's ``(-created_at, -id)`` ordering.
+    """
+    properties = filter_properties(Property.objects.all(), query)
+    if query.q and not query.is_keyset:
+        properties = properties.annotate(
+            rank=SearchRank(F("search_vector"), _search_query(query.q))
+        ).order_by("-rank", "-id")
+    return properties
+
+
+# -------------------
+# Listing pages: cached id lists, assembled from the entity cache
+# -------------------
+def _listing_shapes_key(generation):
+    return f"{LISTING_SHAPES_PREFIX}:g{generation}"
+
+
+def _shape_params(query):
+    # Only the filters decide which properties a page can hold
+    shape = query._replace(page=1, per_page=DEFAULT_PER_PAGE, cursor=None, fields=None)
+    return shape.digest, json.dumps(shape.to_params())
+
+
+def _register_listing_shape(pipeline, query, generation):
+    key = _listing_shapes_key(generation)
+    pipeline.hset(key, *_shape_params(query))
+    pipeline.expire(key, ALL_PROPERTIES_CACHE_TIMEOUT)
+
+
+def register_listing_shape(query, generation):
+    """
+    Record that pages for the filters of ``query`` are being cached in
+    ``generation``; done before their rows are read, so a write committing
+    meanwhile is checked against them (``listing_changes_affect_cache``).
+    """
+    pipeline = get_redis_connection("default").pipeline(transaction=False)
+    _register_listing_shape(pipeline, query, generation)
+    pipeline.execute()
+
+
+async def aregister_listing_shape(query, generation):
+    pipeline = cache.async_client().pipeline(transaction=False)
+    _register_listing_shape(pipeline, query, generation)
+    await pipeline.execute()
+
+
+# Returns nothing past the cap, rather than every registered shape
+_CAPPED_SHAPES_SCRIPT = """
+if redis.call('HLEN', KEYS[1]) > tonumber(ARGV[1]) then
+    return false
+end
+return redis.call('HVALS', KEYS[1])
+"""
+
+
+def _listing_max_shapes():
+    return getattr(
+        settings, "PROPERTIES_LISTING_MAX_SHAPES", DEFAULT_LISTING_MAX_SHAPES
+    )
+
+
+def listing_changes_affect_cache(changes):
+    """
+    Whether updating properties from row ``old`` to ``new`` (dicts of
+    ``LISTING_FIELDS``), for every ``(old, new)`` in ``changes``, can change
+    which properties, or in which order, a page cached in the current
+    generation holds.
+
+    Past ``PROPERTIES_LISTING_MAX_SHAPES`` registered filter shapes the
+    answer is yes without checking, so the cost of a write stays bounded.
+    """
+    changes = list(changes)
+    if any(old["created_at"] != new["created_at"] for old, new in changes):
+        return True
+
+    conn = get_redis_connection("default")
+    shapes = conn.register_script(_CAPPED_SHAPES_SCRIPT)(
+        keys=[_listing_shapes_key(get_cache_generation())],
+        args=[_listing_max_shapes()],
+    )
+    if shapes is None:
+        return True
+    queries = [ListingQuery.from_params(json.loads(params)) for params in shapes]
+    for old, new in changes:
+        text_changed = any(old[field] != new[field] for field in SEARCH_FIELDS)
+        for query in queries:
+            # Search membership and rank both depend on the text
+            if query.q and text_changed:
+                return True
+            if row_matches(query, old) != row_matches(query, new):
+                return True
+    return False
+
+
+def _page_ids(rows):
+    return [row["id"] for row in rows]
+
+
+def _keyset_payload(query, ids, next_cursor):
+    return {
+        "per_page": query.per_page,
+        "next": next_cursor is not None,
+        "next_cursor": next_cursor,
+        "ids": ids,
+    }
+
+
+def _numbered_page(query, properties, count):
+    paginator = CountedPaginator(properties, query.per_page, count)
+    try:
+        return paginator.page(query.page)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+
+
+def _numbered_payload(query, properties_page, count_exact, ids):
+    paginator = properties_page.paginator
+    return {
+        "count": paginator.count,
+        "count_exact": count_exact,
+        "total_pages": paginator.num_pages,
+        "current_page": properties_page.number,
+        "per_page": query.per_page,
+        "next": properties_page.has_next(),
+        "previous": properties_page.has_previous(),
+        "ids": ids,
+    }
+
+
+def _build_listing_page(query, generation):
+    register_listing_shape(query, generation)
+    properties = listing_queryset(query)
+    if query.is_keyset:
+        rows, next_cursor = keyset_page(
+            properties, query.cursor, query.per_page, DEFAULT_LIST_FIELDS
+        )
+        page = _keyset_payload(query, _page_ids(rows), next_cursor)
+    else:
+        count, count_exact = get_property_count(properties, query.filters)
+        properties_page = _numbered_page(query, properties, count)
+        rows = list(properties_page.object_list.values(*DEFAULT_LIST_FIELDS))
+        page = _numbered_payload(query, properties_page, count_exact, _page_ids(rows))
+
+    # The rows were read anyway; spare the assembly a query
+    store_entities(rows)
+    return page
+
+
+async def _abuild_listing_page(query, generation):
+    await aregister_listing_shape(query, generation)
+    properties = listing_queryset(query)
+    if query.is_keyset:
+        rows, next_cursor = await akeyset_page(
+            properties, query.cursor, query.per_page, DEFAULT_LIST_FIELDS
+        )
+        page = _keyset_payload(query, _page_ids(rows), next_cursor)
+    else:
+        # Planner estimates need a raw cursor, which has no async API
+        count, count_exact = await sync_to_async(get_property_count)(
+            properties, query.filters
+        )
+        properties_page = _numbered_page(query, properties, count)
+        rows = [
+            row
+            async for row in properties_page.object_list.values(*DEFAULT_LIST_FIELDS)
+        ]
+        page = _numbered_payload(query, properties_page, count_exact, _page_ids(rows))
+
+    await astore_entities(rows)
+    return page
+
+
+def _needs_detail(query):
+    # Only detail rows carry the description
+    return "description" in query.projection
+
+
+def _assemble(query, page, rows):
+    """
+    Return the listing payload for the cached ``page``: its ids replaced by
+    the ``query.projection`` of their rows. Ids deleted since the page was
+    cached are skipped.
+    """
+    payload = {name: value for name, value in page.items() if name != "ids"}
+    fields = query.projection
+    payload["data"] = [
+        {field: rows[pk][field] for field in fields}
+        for pk in page["ids"]
+        if pk in rows
+    ]
+    return payload
+
+
+def _page_digest(query):
+    # Every projection of a page shares its id list
+    return query._replace(fields=None).digest
+
+
+def _page_key(query, generation):
+    return versioned_key(ALL_PROPERTIES_CACHE_PREFIX, _page_digest(query), generation)
+
+
+def _stale_page_key(query):
+    return f"{ALL_PROPERTIES_CACHE_PREFIX}:stale:{_page_digest(query)}"
+
+
+def _listing_soft_timeout():
+    return getattr(
+        settings, "PROPERTIES_LISTING_SOFT_TIMEOUT", DEFAULT_LISTING_SOFT_TIMEOUT
+    )
+
+
+def _page_refresh(query, generation):
+    """
+    Return the callback that queues a background rebuild of the page, or
+    None (rebuild in the request) when soft expiry is disabled.
+    """
+    if not _listing_soft_timeout():
+        return None
+
+    def refresh():
+        from .tasks import refresh_listing_page_task
+
+        refresh_listing_page_task.delay(
+            query._replace(fields=None).to_params(), generation
+        )
+
+    return refresh
+
+
+def refresh_listing_page(query, generation):
+    """
+    Rebuild the cached page of ``query`` in ``generation`` once it went
+    stale. Returns whether it was rebuilt; pages of an older generation are
+    left to expire.
+    """
+    if generation != get_cache_generation():
+        return False
+    return refresh_entry(
+        _page_key(query, generation),
+        lambda: _build_listing_page(query, generation),
+        ALL_PROPERTIES_CACHE_TIMEOUT,
+        stale_key=_stale_page_key(query),
+        soft_timeout=_listing_soft_timeout(),
+    )
+
+
+def _get_listing_page(query, generation):
+    # Returns (page, fresh), see get_or_build_entry
+    return get_or_build_entry(
+        _page_key(query, generation),
+        lambda: _build_listing_page(query, generation),
+        ALL_PROPERTIES_CACHE_TIMEOUT,
+        stale_key=_stale_page_key(query),
+        soft_timeout=_listing_soft_timeout(),
+        refresh=_page_refresh(query, generation),
+    )
+
+
+async def _aget_listing_page(query, generation):
+    async def abuild():
+        return await _abuild_listing_page(query, generation)
+
+    return await aget_or_build_entry(
+        _page_key(query, generation),
+        abuild,
+        ALL_PROPERTIES_CACHE_TIMEOUT,
+        stale_key=_stale_page_key(query),
+        soft_timeout=_listing_soft_timeout(),
+        refresh=_page_refresh(query, generation),
+    )
+
+
+def get_all_properties(query=None, generation=None):
+    """
+    Return one materialized page of the property listing for ``query``.
+
+    Only the ids of a page (and its count) are cached per canonical query
+    shape; the rows come from the entity cache in one round trip, so a
+    repeated listing request is served from Redis without any SQL, and
+    editing a property does not throw the page away. While one worker
+    rebuilds a page, concurrent requests get its previous copy. A page
+    older than ``PROPERTIES_LISTING_SOFT_TIMEOUT`` is still served while a
+    Celery task rebuilds it.
+    """
+    if query is None:
+        query = ListingQuery.from_params({})
+    if generation is None:
+        generation = get_cache_generation()
+    payload, _ = _listing_payload(query, generation)
+    return payload
+
+
+def _listing_payload(query, generation):
+    page, fresh = _get_listing_page(query, generation)
+    rows = get_entities(page["ids"], _needs_detail(query))
+    return _assemble(query, page, rows), fresh
+
+
+async def aget_all_properties(query, generation=None):
+    """
+    Async ``get_all_properties``; shares its cache entries.
+    """
+    if generation is None:
+        generation = await aget_cache_generation()
+    payload, _ = await _alisting_payload(query, generation)
+    return payload
+
+
+async def _alisting_payload(query, generation):
+    page, fresh = await _aget_listing_page(query, generation)
+    rows = await aget_entities(page["ids"], _needs_detail(query))
+    return _assemble(query, page, rows), fresh
+
+
+def _list_json_key(query, generation, revision):
+    return versioned_key(
+        PROPERTY_LIST_JSON_CACHE_PREFIX, f"{query.digest}:r{revision}", generation
+    )
+
+
+def _list_json_timeout():
+    # A body must not outlive the page it was assembled from by much
+    soft_timeout = _listing_soft_timeout()
+    if soft_timeout:
+        return min(PROPERTY_LIST_JSON_CACHE_TIMEOUT, soft_timeout)
+    return PROPERTY_LIST_JSON_CACHE_TIMEOUT
+
+
+def get_property_list_json(query, generation=None, revision=None):
+    """
+    Return ``(body, fresh)``: the encoded JSON body of the property listing
+    for ``query``, and whether it is current for ``generation`` and
+    ``revision``.
+
+    The final bytes are cached per page, projection and revision, and
+    stored raw, so a hit involves no dict building, no JSON encoding and
+    no unpickling. An entity-only write moves the revision, after which
+    bodies are assembled again from the cached ids and rows. A body
+    assembled from a fallback page (past its soft TTL, or the previous
+    copy served during a rebuild) is not cached and not fresh.
+    """
+    if generation is None:
+        generation = get_cache_generation()
+    if revision is None:
+        revision = get_cache_revision()
+
+    key = _list_json_key(query, generation, revision)
+    body = cache.get(key)
+    if body is not None:
+        return body, True
+    payload, fresh = _listing_payload(query, generation)
+    body = encode_json(payload)
+    if fresh:
+        cache.set(key, body, _list_json_timeout())
+    return body, fresh
+
+
+async def aget_property_list_json(query, generation=None, revision=None):
+    """
+    Async ``get_property_list_json``; shares its cache entries.
+    """
+    if generation is None:
+        generation = await aget_cache_generation()
+    if revision is None:
+        revision = await aget_cache_revision()
+
+    key = _list_json_key(query, generation, revision)
+    body = await cache.aget(key)
+    if body is not None:
+        return body, True
+    payload, fresh = await _alisting_payload(query, generation)
+    body = encode_json(payload)
+    if fresh:
+        await cache.aset(key, body, _list_json_timeout())
+    return body, fresh
+
+
+def get_property_detail_json(pk, generation=None, revision=None):
+    """
+    Return the encoded JSON body of one property with all its fields, or
+    None if there is no such property.
+
+    Bodies are cached like listing bodies, built from the detail row.
+    """
+    if generation is None:
+        generation = get_cache_generation()
+    if revision is None:
+        revision = get_cache_revision()
+
+    key = versioned_key(
+        PROPERTY_DETAIL_JSON_CACHE_PREFIX, f"{pk}:r{revision}", generation
+    )
+    body = cache.get(key)
+    if body is None:
+        row = get_entities([pk], detail=True).get(pk)
+        # A missing property is cached too, as an empty body
+        body = encode_json(row) if row is not None else b""
+        cache.set(key, body, PROPERTY_DETAIL_JSON_CACHE_TIMEOUT)
+    return body or None
+
+
 def get_redis_cache_metrics():
     """
-    Retrieve Redis cache hit/miss metrics and calculate hit ratio.
+    Retrieve cache hit/miss metrics per key family and calculate hit ratios.
+
+    The counters are recorded by the cache backend for this app's keys only
+    and summed over all worker processes, unlike Redis' keyspace-wide
+    ``INFO`` numbers which also count Celery broker traffic.
     """
     try:
-        redis_conn = get_redis_connection("default")
-        info = redis_conn.info()
+        families = {}
+        total_hits = total_misses = 0
+
+        for family, fields in cache.cluster_cache_stats().items():
+            hits = int(fields.get("l1_hits", 0) + fields.get("l2_hits", 0))
+            misses = int(fields.get("misses", 0))
+            total_requests = hits + misses
 
-        hits = info.get("keyspace_hits", 0)
-        misses = info.get("keyspace_misses", 0)
+            families[family] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / total_requests, 4) if total_requests else 0,
+                "l1_hits": int(fields.get("l1_hits", 0)),
+                "sets": int(fields.get("sets", 0)),
+                "bytes_read": int(fields.get("bytes_read", 0)),
+                "bytes_written": int(fields.get("bytes_written", 0)),
+            }
+            total_hits += hits
+            total_misses += misses
 
-        total_requests = hits + misses
-        hit_ratio = hits / total_requests if total_requests > 0 else 0
+        total_requests = total_hits + total_misses
+        hit_ratio = total_hits / total_requests if total_requests > 0 else 0
 
         metrics = {
-            "keyspace_hits": hits,
-            "keyspace_misses": misses,
+            "hits": total_hits,
+            "misses": total_misses,
             "hit_ratio": round(hit_ratio, 4),
+            "families": families,
         }
 
         logger.info(
-            "Redis cache metrics | hits=%s misses=%s hit_ratio=%s",
-            hits,
-            misses,
+            "Cache metrics | hits=%s misses=%s hit_ratio=%s",
+            total_hits,
+            total_misses,
             metrics["hit_ratio"],
         )
+        for family, family_metrics in families.items():
+            logger.info(
+                "Cache metrics [%s] | hits=%s misses=%s hit_ratio=%s",
+                family,
+                family_metrics["hits"],
+                family_metrics["misses"],
+                family_metrics["hit_ratio"],
+            )
 
         return metrics
 
     except Exception as exc:
-        logger.error("Error retrieving Redis cache metrics: %s", exc)
+        logger.error("Error retrieving cache metrics: %s", exc)
         return {
-            "keyspace_hits": 0,
-            "keyspace_misses": 0,
+            "hits": 0,
+            "misses": 0,
             "hit_ratio": 0,
+            "families": {},
         }
+
+
+def get_prometheus_metrics():
+    """
+    Return the Prometheus text exposition for the properties service.
+
+    Request, SQL and cache metrics are summed over all worker processes
+    (this process is flushed first so the scrape includes its latest
+    samples); the Redis pool gauges describe the serving process only.
+    """
+    conn = cache.client.get_client(write=True)
+    registry.flush(conn, cache.make_key)
+    samples = registry.load(conn, cache.make_key)
+
+    gauges = []
+    for family, family_metrics in get_redis_cache_metrics()["families"].items():
+        gauges.append(
+            ("cache_hit_ratio", (("family", family),), family_metrics["hit_ratio"])
+        )
+    for state, value in cache.pool_stats().items():
+        gauges.append(("redis_pool_connections", (("state", state),), value))
+
+    return render_prometheus(samples, gauges=gauges)
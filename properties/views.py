@@ -1,166 +1,207 @@
-from django.http import JsonResponse
-from django.views.decorators.cache import cache_page
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import (
+    add_never_cache_headers,
+    get_conditional_response,
+    patch_response_headers,
+    quote_etag,
+)
+from django.utils.http import http_date
 from django.views.decorators.http import require_GET
-from django.core.exceptions import ObjectDoesNotExist
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-import json
 
-from .models import Property
+from .cache import (
+    aget_cache_generation,
+    aget_cache_revision,
+    aget_last_modified,
+    get_cache_generation,
+    get_cache_revision,
+    get_last_modified,
+)
+from .export import EXPORT_CONTENT_TYPES, stream_export
+from .facets import get_property_facets
+from .pagination import InvalidCursor
+from .utils import (
+    PROPERTY_LIST_JSON_CACHE_TIMEOUT,
+    ListingQuery,
+    aget_property_list_json,
+    get_prometheus_metrics,
+    get_property_detail_json,
+    get_property_list_json,
+)
+from .warmup import arecord_query_access, record_query_access
+
+
+def _invalid_cursor_response():
+    return JsonResponse(
+        {"error": "Invalid cursor"},
+        status=400,
+        safe=True,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def _listing_etag(resource, generation, revision):
+    # The revision changes with every entity-only write (touch_properties_cache)
+    return quote_etag(f"{generation}.{revision}-{resource}")
+
+
+def _with_listing_headers(response, etag, last_modified, fresh=True):
+    if not fresh:
+        # Built from a fallback page that may predate the current validators
+        add_never_cache_headers(response)
+        return response
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    patch_response_headers(response, PROPERTY_LIST_JSON_CACHE_TIMEOUT)
+    return response
 
 
-@cache_page(60 * 15)  # Cache for 15 minutes
 @require_GET
 def property_list(request):
+    # -------------------
+    # Filtering & pagination (?page= or keyset ?cursor=)
+    # -------------------
     try:
-        # Get all properties
-        properties = Property.objects.all()
-        
-        # Get query parameters for filtering (optional)
-        location = request.GET.get('location', None)
-        min_price = request.GET.get('min_price', None)
-        max_price = request.GET.get('max_price', None)
-        
-        # Apply filters if provided
-        if location:
-            properties = properties.filter(location__icontains=location)
-        if min_price:
-            properties = properties.filter(price__gte=min_price)
-        if max_price:
-            properties = properties.filter(price__lte=max_price)
-        
-        # Pagination
-        page = request.GET.get('page', 1)
-        per_page = request.GET.get('per_page', 10)
-        
-        try:
-            per_page = int(per_page)
-            per_page = min(max(per_page, 1), 100)  # Limit per_page between 1 and 100
-        except ValueError:
-            per_page = 10
-        
-        paginator = Paginator(properties, per_page)
-        
-        try:
-            properties_page = paginator.page(page)
-        except PageNotAnInteger:
-            properties_page = paginator.page(1)
-        except EmptyPage:
-            properties_page = paginator.page(paginator.num_pages)
-        
-        # Prepare data
-        data = {
-            "count": paginator.count,
-            "total_pages": paginator.num_pages,
-            "current_page": properties_page.number,
-            "per_page": per_page,
-            "next": properties_page.has_next(),
-            "previous": properties_page.has_previous(),
-            "data": list(properties_page.object_list.values(
-                "id",
-                "title",
-                "description",
-                "price",
-                "location",
-                "created_at",
-            ))
-        }
-        
-        # Return JSON response
-        return JsonResponse(
-            data,
-            safe=True,
-            json_dumps_params={"ensure_ascii": False},
-        )
-        
-    except Exception as e:
-        # Handle any unexpected errors
-        return JsonResponse({
-                "error": "An error occurred while fetching properties",
-                "details": str(e)
-            },
-            status=500,
-            safe=True,
-            json_dumps_params={"ensure_ascii": False},
-        )
-from django.http import JsonResponse
-from django.views.decorators.cache import cache_page
-from django.views.decorators.http import require_GET
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+        query = ListingQuery.from_params(request.GET)
+    except InvalidCursor:
+        return _invalid_cursor_response()
 
-from .utils import get_all_properties
+    record_query_access(query)
 
+    # -------------------
+    # Conditional GET (validators come from Redis, not Postgres)
+    # -------------------
+    generation = get_cache_generation()
+    revision = get_cache_revision()
+    etag = _listing_etag(query.digest, generation, revision)
+    last_modified = get_last_modified(generation)
 
-@cache_page(60 * 15)  # View-level cache (15 minutes)
-@require_GET
-def property_list(request):
-    # Fetch queryset from Redis or DB
-    properties = get_all_properties()
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
 
     # -------------------
-    # Filtering
+    # Response (pre-encoded JSON bytes; page ids and rows cached apart)
     # -------------------
-    location = request.GET.get("location")
-    min_price = request.GET.get("min_price")
-    max_price = request.GET.get("max_price")
+    fresh = True
+    if response is None:
+        body, fresh = get_property_list_json(query, generation, revision)
+        response = HttpResponse(body, content_type="application/json")
+    return _with_listing_headers(response, etag, last_modified, fresh)
 
-    if location:
-        properties = properties.filter(location__icontains=location)
 
-    if min_price:
-        try:
-            properties = properties.filter(price__gte=min_price)
-        except ValueError:
-            pass
+@require_GET
+async def property_list_async(request):
+    # -------------------
+    # Same contract as property_list; Redis through redis.asyncio, rows
+    # through the async ORM
+    # -------------------
+    try:
+        query = ListingQuery.from_params(request.GET)
+    except InvalidCursor:
+        return _invalid_cursor_response()
 
-    if max_price:
-        try:
-            properties = properties.filter(price__lte=max_price)
-        except ValueError:
-            pass
+    await arecord_query_access(query)
+
+    generation = await aget_cache_generation()
+    revision = await aget_cache_revision()
+    etag = _listing_etag(query.digest, generation, revision)
+    last_modified = await aget_last_modified(generation)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    fresh = True
+    if response is None:
+        body, fresh = await aget_property_list_json(query, generation, revision)
+        response = HttpResponse(body, content_type="application/json")
+    return _with_listing_headers(response, etag, last_modified, fresh)
+
+
+@require_GET
+def property_detail(request, pk):
+    # -------------------
+    # Conditional GET (same validators as property_list, per property)
+    # -------------------
+    generation = get_cache_generation()
+    revision = get_cache_revision()
+    etag = _listing_etag(pk, generation, revision)
+    last_modified = get_last_modified(generation)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
 
     # -------------------
-    # Pagination
+    # Response (every field, including the long text the list leaves out)
     # -------------------
-    page = request.GET.get("page", 1)
-    per_page = request.GET.get("per_page", 10)
+    if response is None:
+        body = get_property_detail_json(pk, generation, revision)
+        if body is None:
+            raise Http404("No such property")
+        response = HttpResponse(body, content_type="application/json")
+    return _with_listing_headers(response, etag, last_modified)
+
 
+@require_GET
+def property_export(request):
+    # -------------------
+    # Filters (same as property_list, without pagination) & format
+    # -------------------
+    export_format = (request.GET.get("format") or "ndjson").lower()
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return JsonResponse(
+            {"error": "Unsupported format", "formats": sorted(EXPORT_CONTENT_TYPES)},
+            status=400,
+            json_dumps_params={"ensure_ascii": False},
+        )
     try:
-        per_page = int(per_page)
-        per_page = min(max(per_page, 1), 100)
-    except (TypeError, ValueError):
-        per_page = 10
+        query = ListingQuery.from_params(request.GET)
+    except InvalidCursor:
+        return _invalid_cursor_response()
+
+    # -------------------
+    # Response (rows streamed from a server-side cursor)
+    # -------------------
+    response = StreamingHttpResponse(
+        stream_export(query, export_format),
+        content_type=EXPORT_CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="properties.{export_format}"'
+    )
+    return response
 
-    paginator = Paginator(properties, per_page)
 
+@require_GET
+def property_facets(request):
+    # -------------------
+    # Filters (same as property_list; pagination is ignored)
+    # -------------------
     try:
-        properties_page = paginator.page(page)
-    except PageNotAnInteger:
-        properties_page = paginator.page(1)
-    except EmptyPage:
-        properties_page = paginator.page(paginator.num_pages)
+        query = ListingQuery.from_params(request.GET)
+    except InvalidCursor:
+        return _invalid_cursor_response()
 
     # -------------------
-    # Response
+    # Response (location and price-bucket counts, cached per filter shape)
     # -------------------
     return JsonResponse(
-        {
-            "count": paginator.count,
-            "total_pages": paginator.num_pages,
-            "current_page": properties_page.number,
-            "per_page": per_page,
-            "next": properties_page.has_next(),
-            "previous": properties_page.has_previous(),
-            "data": list(
-                properties_page.object_list.values(
-                    "id",
-                    "title",
-                    "description",
-                    "price",
-                    "location",
-                    "created_at",
-                )
-            ),
-        },
-        safe=True,
+        get_property_facets(query),
         json_dumps_params={"ensure_ascii": False},
     )
+
+
+@require_GET
+def property_metrics(request):
+    # -------------------
+    # Prometheus text exposition (request, SQL, cache and Redis pool metrics)
+    # -------------------
+    return HttpResponse(
+        get_prometheus_metrics(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,175 @@
+"""
+Cache warm-up for the property listing.
+
+``property_list`` records a sample of the query shapes it serves in a Redis
+sorted set, trimmed to the ``ACCESS_STATS_KEEP_FACTOR`` times
+``PROPERTIES_WARM_TOP_N`` most requested ones. ``warm_property_cache`` replays the most requested shapes (plus
+any configured in ``PROPERTIES_WARM_QUERIES``) through the same code path
+as the view, so the first visitors after a deploy, a Redis restart or an
+invalidation are served from cache.
+"""
+import json
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django_redis import get_redis_connection
+
+from .utils import ListingQuery, get_property_list_json
+
+logger = logging.getLogger(__name__)
+
+ACCESS_STATS_KEY = "properties:access_stats"
+LAST_WRITE_KEY = "properties:last_write"
+WARMUP_SCHEDULED_KEY = "properties:warmup_scheduled"
+
+DEFAULT_ACCESS_STATS_SAMPLE_RATE = 0.1
+DEFAULT_WARM_TOP_N = 50
+DEFAULT_WARM_WORKERS = 4
+DEFAULT_WARM_DEBOUNCE = 30  # seconds without writes before warming
+# Shapes kept in the access stats, in multiples of the warm-up's top N
+ACCESS_STATS_KEEP_FACTOR = 10
+
+
+def _sampled_access_member(query):
+    rate = getattr(
+        settings,
+        "PROPERTIES_ACCESS_STATS_SAMPLE_RATE",
+        DEFAULT_ACCESS_STATS_SAMPLE_RATE,
+    )
+    # Deep keyset pages are unique per client and not worth replaying
+    if query.cursor or random.random() >= rate:
+        return None
+    return json.dumps(query.to_params(), sort_keys=True)
+
+
+def _record_access(pipeline, member):
+    keep = ACCESS_STATS_KEEP_FACTOR * getattr(
+        settings, "PROPERTIES_WARM_TOP_N", DEFAULT_WARM_TOP_N
+    )
+    pipeline.zincrby(ACCESS_STATS_KEY, 1, member)
+    # Members come from client input; drop all but the most requested
+    pipeline.zremrangebyrank(ACCESS_STATS_KEY, 0, -keep - 1)
+
+
+def record_query_access(query):
+    """
+    Count a sampled request for ``query`` in the access statistics.
+    """
+    member = _sampled_access_member(query)
+    if member is None:
+        return
+    try:
+        pipeline = get_redis_connection("default").pipeline(transaction=False)
+        _record_access(pipeline, member)
+        pipeline.execute()
+    except Exception as exc:
+        logger.warning("Could not record property query access: %s", exc)
+
+
+async def arecord_query_access(query):
+    """
+    Async ``record_query_access``, through the cache's async Redis client.
+    """
+    member = _sampled_access_member(query)
+    if member is None:
+        return
+    try:
+        pipeline = cache.async_client().pipeline(transaction=False)
+        _record_access(pipeline, member)
+        await pipeline.execute()
+    except Exception as exc:
+        logger.warning("Could not record property query access: %s", exc)
+
+
+def top_query_params(limit):
+    """
+    Return the parameters of the ``limit`` most requested query shapes.
+    """
+    members = get_redis_connection("default").zrevrange(
+        ACCESS_STATS_KEY, 0, limit - 1
+    )
+    return [json.loads(member) for member in members]
+
+
+def _warm_one(params):
+    try:
+        get_property_list_json(ListingQuery.from_params(params))
+        return True
+    except Exception as exc:
+        logger.warning("Could not warm property listing %s: %s", params, exc)
+        return False
+    finally:
+        # Worker threads open their own connections; don't leak them
+        close_old_connections()
+
+
+def warm_property_cache(top_n=None, workers=None, use_stats=True):
+    """
+    Replay the configured and most requested query shapes through the
+    listing cache with a bounded thread pool.
+
+    Returns ``(warmed, failed)``.
+    """
+    top_n = top_n or getattr(settings, "PROPERTIES_WARM_TOP_N", DEFAULT_WARM_TOP_N)
+    workers = workers or getattr(
+        settings, "PROPERTIES_WARM_WORKERS", DEFAULT_WARM_WORKERS
+    )
+
+    candidates = list(getattr(settings, "PROPERTIES_WARM_QUERIES", []))
+    if use_stats:
+        try:
+            candidates += top_query_params(top_n)
+        except Exception as exc:
+            logger.warning("Could not read property access stats: %s", exc)
+
+    # Different parameter spellings may share one canonical shape
+    queries = {}
+    for params in candidates:
+        query = ListingQuery.from_params(params)
+        queries.setdefault(query, query.to_params())
+    params_list = list(queries.values())[:top_n]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_warm_one, params_list))
+
+    warmed = sum(results)
+    return warmed, len(results) - warmed
+
+
+def schedule_cache_warmup():
+    """
+    Warm the listing cache once Property writes have settled.
+
+    Called after every write; at most one warm-up task is pending at a time,
+    and it reschedules itself until no write happened for
+    ``PROPERTIES_WARM_DEBOUNCE`` seconds.
+    """
+    if not getattr(settings, "PROPERTIES_WARM_AFTER_WRITES", False):
+        return
+
+    debounce = getattr(settings, "PROPERTIES_WARM_DEBOUNCE", DEFAULT_WARM_DEBOUNCE)
+    cache.set(LAST_WRITE_KEY, time.time(), None)
+
+    # Expires on its own in case the scheduled task is lost
+    if not cache.add(WARMUP_SCHEDULED_KEY, 1, debounce * 10):
+        return
+
+    from .tasks import warm_property_cache_task
+
+    try:
+        warm_property_cache_task.apply_async(countdown=debounce)
+    except Exception as exc:
+        cache.delete(WARMUP_SCHEDULED_KEY)
+        logger.warning("Could not schedule property cache warm-up: %s", exc)
+
+
+def seconds_since_last_write():
+    last_write = cache.get(LAST_WRITE_KEY)
+    if last_write is None:
+        return None
+    return time.time() - last_write